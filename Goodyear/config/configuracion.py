@@ -21,3 +21,40 @@ ESTADO_RECIBIDO = "Recibido"
 ESTADO_EVALUACION = "En evaluación"
 ESTADO_RESUELTO = "Resuelto"
 ESTADOS = [ESTADO_RECIBIDO, ESTADO_EVALUACION, ESTADO_RESUELTO]
+
+# Pool de conexiones SQLite (ver core.gestor_reclamos.PoolConexiones)
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT_MS = 5000
+# Entradas del cache LRU de consultas de GestorDB (0 lo desactiva)
+DB_CACHE_MAX_ENTRADAS = 512
+# Escritor único con group commit (ver core.escritor); opcional
+DB_ESCRITOR_AGRUPADO = False
+DB_ESCRITOR_MAX_LOTE = 64
+# Hilos (y conexiones propias) del executor de AsyncGestorDB
+DB_ASYNC_HILOS = 4
+
+# Filas por página en los listados paginados (keyset)
+TAM_PAGINA = 20
+
+# Exportaciones de reportería en segundo plano (ver core.exportes.ColaExportes)
+EXPORTS_DIR = BASE_DIR / "exports"
+EXPORT_TRABAJADORES = 2
+EXPORT_MAX_ARCHIVOS = 32
+
+# Reportes programados sin Streamlit (utils/generar_reportes.py)
+REPORTES_DIR = BASE_DIR / "reportes"
+REPORTES_CONSERVAR_DIAS = 30
+
+# Gráficos de reportería: tope de datos enviados al navegador por gráfico
+REPORTE_MAX_PUNTOS = 500  # puntos de series y celdas del mapa de calor
+REPORTE_MAX_BINS = 24  # barras del histograma de lead time
+REPORTE_MAX_CATEGORIAS = 25  # barras por categoría (transportistas, causas)
+# Hilos que calculan en paralelo las piezas del tablero (ver core.tablero_reporte)
+REPORTE_HILOS = 4
+# Vistas filtradas del tablero (frames + KPIs + gráficos) reutilizables entre reruns
+REPORTE_CACHE_VISTAS_MB = 256
+REPORTE_CACHE_VISTAS_MAX = 32
+
+# Snapshots columnares (Arrow IPC) del dataset de reportería para arranques en frío
+REPORTE_SNAPSHOT_DIR = BASE_DIR / "data" / "snapshots"
+REPORTE_SNAPSHOT_INTERVALO_S = 300  # mínimo entre reescrituras por cambios incrementales
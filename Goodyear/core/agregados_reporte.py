@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados para los gráficos de reportería, calculados en el servidor.
+
+Los gráficos reciben solo datos ya agregados y acotados: series diarias
+reducidas con LTTB (largest-triangle-three-buckets), histogramas con los
+bins calculados con NumPy y categorías limitadas a las de más volumen. Así
+el JSON que viaja al navegador no crece con el número de filas.
+"""
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config.configuracion import REPORTE_MAX_BINS, REPORTE_MAX_CATEGORIAS, REPORTE_MAX_PUNTOS
+
+_DIA_NS = 86_400 * 10**9
+
+
+def lttb(x: np.ndarray, y: np.ndarray, umbral: int) -> np.ndarray:
+    """
+    Índices de los puntos que conserva LTTB para dibujar (x, y) con ``umbral`` puntos.
+
+    Mantiene el primero y el último; de cada bucket intermedio elige el punto
+    que forma el triángulo de mayor área con el elegido antes y el promedio
+    del bucket siguiente, lo que preserva picos y valles. ``x`` debe estar
+    ordenado.
+    """
+    n = len(x)
+    if umbral >= n or umbral < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bordes = np.linspace(1, n - 1, umbral - 1).astype(np.int64)
+    indices = np.empty(umbral, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(umbral - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        if i + 2 < len(bordes):
+            mx, my = x[fin:bordes[i + 2]].mean(), y[fin:bordes[i + 2]].mean()
+        else:
+            mx, my = x[-1], y[-1]
+        areas = np.abs((x[a] - mx) * (y[ini:fin] - y[a]) - (x[a] - x[ini:fin]) * (my - y[a]))
+        a = ini + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def reducir_serie(serie: pd.DataFrame, x: str, y: str, max_puntos: int = REPORTE_MAX_PUNTOS) -> pd.DataFrame:
+    """Aplica LTTB a una serie (ordenada por ``x``) si supera ``max_puntos``."""
+    if len(serie) <= max_puntos:
+        return serie
+    xs = pd.to_datetime(serie[x]).to_numpy("datetime64[ns]").view("int64")
+    return serie.iloc[lttb(xs, serie[y].to_numpy(), max_puntos)].reset_index(drop=True)
+
+
+def serie_diaria(fechas: pd.Series, max_puntos: int = REPORTE_MAX_PUNTOS) -> pd.DataFrame:
+    """Conteo por día de una columna datetime (columnas fecha, despachos), reducido con LTTB."""
+    ns = fechas.to_numpy("datetime64[ns]")
+    dias = ns[~np.isnat(ns)].view("int64") // _DIA_NS
+    if not len(dias):
+        return pd.DataFrame(columns=["fecha", "despachos"])
+    # Conteo por día con bincount (lineal) en vez de ordenar las fechas
+    primero = int(dias.min())
+    conteos = np.bincount(dias - primero)
+    con_datos = np.flatnonzero(conteos)
+    unicos = (con_datos + primero).astype("datetime64[D]")
+    serie = pd.DataFrame({"fecha": pd.to_datetime(unicos).date, "despachos": conteos[con_datos]})
+    return reducir_serie(serie, "fecha", "despachos", max_puntos)
+
+
+def _paso_redondo(rango: float, max_bins: int) -> float:
+    """Ancho de bin 1, 2 o 5 × 10^k que deja a lo sumo ``max_bins`` bins."""
+    crudo = rango / max_bins if rango > 0 else 1.0
+    base = 10 ** math.floor(math.log10(crudo))
+    for m in (1, 2, 5, 10):
+        if m * base >= crudo:
+            return m * base
+    return 10 * base
+
+
+def histograma(valores: pd.Series, max_bins: int = REPORTE_MAX_BINS) -> pd.DataFrame:
+    """Bins de ancho redondo (columnas desde, hasta, conteo) para un histograma."""
+    v = pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64)
+    v = v[np.isfinite(v)]
+    if not len(v):
+        return pd.DataFrame(columns=["desde", "hasta", "conteo"])
+    vmin, vmax = float(v.min()), float(v.max())
+    paso = _paso_redondo(vmax - vmin, max_bins)
+    if paso < 1 and np.array_equal(v, np.round(v)):
+        paso = 1.0  # valores enteros (p.ej. días): sin bins vacíos entre enteros
+    inicio = math.floor(vmin / paso) * paso
+    n_bins = max(1, math.floor((vmax - inicio) / paso) + 1)
+    bordes = inicio + paso * np.arange(n_bins + 1)
+    conteo, _ = np.histogram(v, bins=bordes)
+    return pd.DataFrame({"desde": bordes[:-1], "hasta": bordes[1:], "conteo": conteo})
+
+
+def limitar_categorias(df: pd.DataFrame, peso: str, max_categorias: int = REPORTE_MAX_CATEGORIAS) -> pd.DataFrame:
+    """Las ``max_categorias`` filas de mayor ``peso``."""
+    if len(df) <= max_categorias:
+        return df
+    return df.sort_values(peso, ascending=False, kind="stable").head(max_categorias)
+
+
+def limitar_celdas(
+    df: pd.DataFrame, fila: str, peso: Optional[str] = None, max_celdas: int = REPORTE_MAX_PUNTOS
+) -> pd.DataFrame:
+    """
+    Acota un mapa de calor a ``max_celdas`` conservando las filas (p.ej.
+    transportistas) de más volumen según ``peso`` (o más celdas si es None).
+    """
+    if len(df) <= max_celdas or df.empty:
+        return df
+    volumen = df.groupby(fila, observed=True)[peso].sum() if peso else df.groupby(fila, observed=True).size()
+    por_fila = len(df) / max(1, len(volumen))
+    n = max(1, int(max_celdas // max(1.0, por_fila)))
+    return df[df[fila].isin(volumen.nlargest(n).index)]
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Cache LRU en proceso para resultados de consultas de GestorDB.
+
+Cada entrada se registra bajo las tablas de las que depende; una escritura en
+una tabla invalida exactamente esas entradas. Un contador de generación por
+tabla evita guardar un resultado leído mientras otra escritura lo invalidaba.
+Las escrituras de otros procesos se detectan comparando las versiones por
+tabla persistidas en la base (``sincronizar_versiones``).
+
+``CacheMemoria`` es un LRU acotado por bytes (además de por entradas) para
+valores grandes como DataFrames; la clave debe incluir la versión de los
+datos, así que no necesita invalidación: lo viejo sale por LRU.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Set, Tuple
+
+
+class CacheConsultas:
+    def __init__(self, max_entradas: int) -> None:
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[Hashable, Tuple[Any, Tuple[str, ...]]]" = OrderedDict()
+        self._por_tabla: Dict[str, Set[Hashable]] = {}
+        self._generacion: Dict[str, int] = {}
+        self._versiones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave: Hashable, tablas: Tuple[str, ...], cargar: Callable[[], Any]) -> Any:
+        """Devuelve el valor cacheado o lo carga con ``cargar()`` y lo guarda."""
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave][0]
+            self.misses += 1
+            generacion = self._generaciones(tablas)
+
+        valor = cargar()
+
+        with self._lock:
+            # Si una escritura invalidó alguna tabla durante la lectura, no guardar
+            if generacion == self._generaciones(tablas) and self.max_entradas > 0:
+                self._quitar(clave)
+                self._datos[clave] = (valor, tablas)
+                for t in tablas:
+                    self._por_tabla.setdefault(t, set()).add(clave)
+                while len(self._datos) > self.max_entradas:
+                    self._quitar(next(iter(self._datos)))
+        return valor
+
+    def invalidar(self, *tablas: str) -> None:
+        with self._lock:
+            for t in tablas:
+                self._generacion[t] = self._generacion.get(t, 0) + 1
+                for clave in list(self._por_tabla.get(t, ())):
+                    self._quitar(clave)
+                    self.invalidaciones += 1
+
+    def sincronizar_versiones(self, versiones: Dict[str, int]) -> None:
+        """
+        Invalida las tablas cuya versión persistida cambió desde la última vez.
+
+        ``versiones`` viene de la tabla versiones_tabla, que incrementan los
+        triggers en cada escritura de cualquier proceso.
+        """
+        with self._lock:
+            cambiadas = [t for t, v in versiones.items() if self._versiones.get(t) != v]
+            self._versiones.update(versiones)
+        if cambiadas:
+            self.invalidar(*cambiadas)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            for t in list(self._por_tabla):
+                self._generacion[t] = self._generacion.get(t, 0) + 1
+            self._datos.clear()
+            self._por_tabla.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tasa_hits": (self.hits / total) if total else 0.0,
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "invalidaciones": self.invalidaciones,
+            }
+
+    # -- internos (requieren self._lock) --
+    def _generaciones(self, tablas: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self._generacion.get(t, 0) for t in tablas)
+
+    def _quitar(self, clave: Hashable) -> None:
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return
+        for t in entrada[1]:
+            claves = self._por_tabla.get(t)
+            if claves is not None:
+                claves.discard(clave)
+
+
+class CacheMemoria:
+    def __init__(self, max_bytes: int, max_entradas: int, tamano: Callable[[Any], int]) -> None:
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        self._tamano = tamano
+        self._datos: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor cacheado o lo carga con ``cargar()`` y lo guarda.
+
+        Un valor que por sí solo supera ``max_bytes`` se devuelve sin guardar.
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return entrada[0]
+            self.misses += 1
+
+        valor = cargar()
+        tamano = self._tamano(valor)
+
+        with self._lock:
+            if tamano <= self.max_bytes and self.max_entradas > 0:
+                self._quitar(clave)
+                self._datos[clave] = (valor, tamano)
+                self._bytes += tamano
+                while self._bytes > self.max_bytes or len(self._datos) > self.max_entradas:
+                    self._quitar(next(iter(self._datos)))
+                    self.expulsiones += 1
+        return valor
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tasa_hits": (self.hits / total) if total else 0.0,
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "expulsiones": self.expulsiones,
+            }
+
+    def _quitar(self, clave: Hashable) -> None:
+        """Requiere self._lock."""
+        entrada = self._datos.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada[1]
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Carga incremental de los datos de reportería.
+
+La primera carga lee las tablas completas; las siguientes piden a GestorDB
+solo las filas creadas, modificadas o borradas desde la última marca
+(``GestorDB.cambios_reporte``) y las combinan con los DataFrames en memoria,
+así el costo de refrescar depende de lo que cambió y no del tamaño total.
+
+Opcionalmente el dataset tipado se persiste como snapshot Arrow IPC (un
+archivo por tabla, cada uno con la marca ``seq`` que cubre en sus
+metadatos): tras un reinicio se abre con memory-map y solo se aplica el
+delta posterior a la menor de esas marcas.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from config.configuracion import REPORTE_SNAPSHOT_INTERVALO_S
+
+TABLAS = ("reclamos", "pedidos", "despachos")
+COLUMNAS_FECHA = ("fecha", "fecha_pedido", "fecha_programada", "fecha_salida", "fecha_entrega")
+
+# Catálogos del modo demo; si se piden más, se completan con nombres genéricos
+CLIENTES_DEMO = ("Tottus", "Falabella", "Ripley", "Makro", "Maestro", "Sodimac")
+TRANSPORTISTAS_DEMO = ("TransLima", "Ransa", "Shalom", "Chaski", "Olva")
+CAUSAS_DEMO = ("Demora transporte", "Error picking", "Falla producto", "Stock insuficiente", "Otro")
+_DIA_NS = 86_400 * 10**9
+FORMATO_SNAPSHOT = 2
+
+
+# Columnas de texto con pocos valores distintos: se guardan como category
+COLUMNAS_CATEGORIA = ("cliente", "transportista", "estado", "causa")
+
+
+def a_fecha(series: pd.Series) -> pd.Series:
+    """Fechas naive en UTC (datetime64[ns], int64 por debajo)."""
+    if pd.api.types.is_datetime64_dtype(series) and not isinstance(series.dtype, pd.DatetimeTZDtype):
+        return series
+    return pd.to_datetime(series, errors="coerce", utc=True).dt.tz_localize(None)
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce la memoria de un frame de reportería: texto repetido a category,
+    enteros y flotantes al tipo más chico que los contiene.
+    """
+    for c in df.columns:
+        s = df[c]
+        if c in COLUMNAS_CATEGORIA and s.dtype == object:
+            df[c] = s.astype("category")
+        elif pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+            continue
+        elif pd.api.types.is_integer_dtype(s):
+            df[c] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            df[c] = s.astype(np.float32)
+    return df
+
+
+def tipar(tabla: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte fechas, agrega las columnas derivadas de despachos y compacta."""
+    for c in COLUMNAS_FECHA:
+        if c in df.columns:
+            df[c] = a_fecha(df[c])
+    if tabla == "despachos":
+        if {"fecha_entrega", "fecha_pedido"}.issubset(df.columns):
+            df["lead_time_dias"] = (df["fecha_entrega"] - df["fecha_pedido"]).dt.total_seconds() / 86400.0
+        if {"fecha_entrega", "fecha_programada"}.issubset(df.columns):
+            df["entrega_a_tiempo"] = df["fecha_entrega"] <= df["fecha_programada"]
+        elif "on_time" in df.columns:
+            df["entrega_a_tiempo"] = df["on_time"].fillna(0).astype(bool)
+    return compactar(df)
+
+
+def reporte_memoria(dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Filas, columnas y memoria (MB, contando el contenido de los objetos) por tabla."""
+    return pd.DataFrame(
+        [
+            {
+                "tabla": t,
+                "filas": len(df),
+                "columnas": df.shape[1],
+                "memoria_mb": round(df.memory_usage(index=True, deep=True).sum() / 2**20, 2),
+            }
+            for t, df in dfs.items()
+        ]
+    )
+
+
+def guardar_snapshot(directorio: Union[str, Path], datos: Dict[str, pd.DataFrame], seq: int) -> None:
+    """
+    Escribe un archivo Arrow IPC por tabla (con ``seq`` en sus metadatos) y
+    luego meta.json con el formato y la lista de tablas.
+
+    Cada archivo se escribe aparte y se renombra (atómico). Varios procesos
+    (servidores de Streamlit, utils/generar_reportes.py) comparten el
+    directorio y sus escrituras pueden intercalarse, así que cada tabla
+    lleva su propia marca: al cargar se parte de la menor, y reaplicar un
+    delta sobre las tablas más nuevas es inocuo porque se combina por id.
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    for tabla, df in datos.items():
+        destino = directorio / f"{tabla}.arrow"
+        parcial = directorio / f"{tabla}.arrow.{os.getpid()}.parcial"  # otro proceso puede estar escribiendo
+        t = pa.Table.from_pandas(df, preserve_index=False)
+        t = t.replace_schema_metadata({**(t.schema.metadata or {}), b"seq": str(seq).encode()})
+        with pa.OSFile(str(parcial), "wb") as f, ipc.new_file(f, t.schema) as w:
+            w.write_table(t)
+        os.replace(parcial, destino)
+    meta = {"formato": FORMATO_SNAPSHOT, "tablas": sorted(datos), "creado": time.time()}
+    parcial = directorio / f"meta.json.{os.getpid()}.parcial"
+    parcial.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(parcial, directorio / "meta.json")
+
+
+def cargar_snapshot(directorio: Union[str, Path]) -> Optional[Tuple[Dict[str, pd.DataFrame], int]]:
+    """
+    Lee el snapshot (memory-map) y la menor marca de sus tablas, que pueden
+    venir de escrituras distintas; None si no hay o no es válido.
+    """
+    directorio = Path(directorio)
+    try:
+        meta = json.loads((directorio / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("formato") != FORMATO_SNAPSHOT:
+            return None
+        datos = {}
+        marcas = []
+        for tabla in meta["tablas"]:
+            with pa.memory_map(str(directorio / f"{tabla}.arrow"), "r") as mm:
+                t = ipc.open_file(mm).read_all()
+                marcas.append(int((t.schema.metadata or {})[b"seq"]))
+                datos[tabla] = t.to_pandas(split_blocks=True)
+        if not marcas:
+            return None
+        return datos, min(marcas)
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+
+
+class CargadorIncremental:
+    """
+    Mantiene en memoria los DataFrames de reportería y los actualiza por deltas.
+
+    ``refrescar()`` es seguro entre hilos (sesiones de Streamlit) y devuelve
+    un dict nuevo con los frames vigentes, que no deben modificarse in situ.
+    Con ``directorio_snapshot`` el primer refresco parte del snapshot en
+    disco, y el snapshot se reescribe tras una carga completa o, si hubo
+    cambios, cada ``intervalo_snapshot`` segundos como mucho.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        directorio_snapshot: Optional[Union[str, Path]] = None,
+        intervalo_snapshot: float = REPORTE_SNAPSHOT_INTERVALO_S,
+    ) -> None:
+        self._db = db
+        self._lock = threading.Lock()
+        self._datos: Dict[str, pd.DataFrame] = {}
+        self.seq: Optional[int] = None
+        self._directorio_snapshot = directorio_snapshot
+        self._intervalo_snapshot = intervalo_snapshot
+        self._leer_snapshot = directorio_snapshot is not None
+        self._seq_guardada: Optional[int] = None
+        self._ultimo_guardado = 0.0
+
+    def refrescar(self) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            if self._leer_snapshot:
+                self._leer_snapshot = False
+                snapshot = cargar_snapshot(self._directorio_snapshot)
+                if snapshot is not None:
+                    self._datos, self.seq = snapshot
+                    self._seq_guardada = self.seq
+            cambios = self._db.cambios_reporte(self.seq)
+            if self.seq is not None and cambios["seq"] < self.seq:
+                # La marca retrocedió (base restaurada o reemplazada): recargar todo
+                self._datos.clear()
+                cambios = self._db.cambios_reporte(None)
+            for tabla, delta in cambios["tablas"].items():
+                nuevos = tipar(tabla, pd.DataFrame(delta["filas"], columns=delta["columnas"]))
+                if cambios["completo"] or tabla not in self._datos:
+                    self._datos[tabla] = nuevos
+                else:
+                    self._datos[tabla] = _combinar(self._datos[tabla], nuevos, delta["borrados"])
+            self.seq = cambios["seq"]
+            self._guardar_snapshot(forzar=cambios["completo"])
+            return dict(self._datos)
+
+    def reiniciar(self) -> None:
+        """Fuerza una carga completa (desde la base) en el próximo refresco."""
+        with self._lock:
+            self._datos.clear()
+            self.seq = None
+            self._leer_snapshot = False
+            self._seq_guardada = None
+
+    def _guardar_snapshot(self, forzar: bool) -> None:
+        """Requiere self._lock. Un snapshot fallido no interrumpe la carga."""
+        if self._directorio_snapshot is None or self.seq == self._seq_guardada:
+            return
+        if not forzar and time.monotonic() - self._ultimo_guardado < self._intervalo_snapshot:
+            return
+        try:
+            guardar_snapshot(self._directorio_snapshot, self._datos, self.seq)
+        except (OSError, pa.ArrowException):
+            return
+        self._seq_guardada = self.seq
+        self._ultimo_guardado = time.monotonic()
+
+
+def _combinar(actual: pd.DataFrame, nuevos: pd.DataFrame, borrados: list) -> pd.DataFrame:
+    """Reemplaza por id las filas cambiadas, agrega las nuevas y quita las borradas."""
+    if nuevos.empty and not borrados:
+        return actual
+    quitar = set(borrados).union(nuevos["id"].tolist())
+    solo_altas = not borrados and (actual.empty or nuevos["id"].min() > actual["id"].max())
+    if not solo_altas:
+        actual = actual[~actual["id"].isin(quitar)]
+    if nuevos.empty:
+        return actual.reset_index(drop=True)
+    # Unificar categorías para que concat no degrade las columnas a object
+    for c in actual.select_dtypes(include="category").columns:
+        if c in nuevos.columns:
+            cats = actual[c].cat.categories
+            faltan = pd.Index(nuevos[c].dropna().unique()).difference(cats)
+            if len(faltan):
+                cats = cats.append(faltan)
+                actual = actual.assign(**{c: actual[c].cat.add_categories(faltan)})
+            nuevos[c] = pd.Categorical(nuevos[c], categories=cats)
+    combinado = pd.concat([actual, nuevos], ignore_index=True)
+    # Las altas llegan con ids crecientes; solo las modificaciones desordenan
+    return combinado if solo_altas else combinado.sort_values("id", kind="stable", ignore_index=True)
+
+
+def _catalogo(base: Sequence[str], n: Optional[int], prefijo: str) -> List[str]:
+    n = len(base) if n is None else n
+    return list(base[:n]) + [f"{prefijo} {i}" for i in range(len(base) + 1, n + 1)]
+
+
+def _categoria(rng: np.random.Generator, valores: Sequence[str], n: int, p=None) -> pd.Categorical:
+    """n valores al azar de ``valores`` (con probabilidades ``p``) como category."""
+    codigos = rng.choice(len(valores), size=n, p=p) if p is not None else rng.integers(0, len(valores), size=n)
+    return pd.Categorical.from_codes(codigos.astype(np.int8 if len(valores) < 128 else np.int32), list(valores))
+
+
+def _fechas(ns: np.ndarray) -> np.ndarray:
+    return ns.astype("datetime64[ns]")
+
+
+def simular_datos(
+    meses: int = 8,
+    semilla: int = 42,
+    pedidos_mes: Tuple[int, int] = (25, 45),
+    transportistas: Optional[int] = None,
+    clientes: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Genera pedidos, despachos y reclamos sintéticos para el modo demo.
+
+    Todo se calcula con operaciones vectorizadas de NumPy, así se pueden
+    generar millones de filas en segundos para pruebas de carga
+    (p.ej. ``pedidos_mes=(25_000, 45_000)``). Misma semilla, mismos datos.
+
+    Args:
+        meses: meses hacia atrás desde el mes actual
+        semilla: semilla del generador aleatorio
+        pedidos_mes: rango [min, max) de pedidos por mes
+        transportistas / clientes: tamaño de los catálogos (None = los de base)
+    """
+    rng = np.random.default_rng(semilla)
+    hoy = pd.Timestamp.utcnow().normalize()
+    inicio_mes = pd.date_range(hoy - pd.offsets.MonthBegin(meses - 1), periods=meses, freq="MS")
+    inicio_mes = inicio_mes.tz_localize(None).asi8
+
+    cat_clientes = _catalogo(CLIENTES_DEMO, clientes, "Cliente")
+    cat_transportistas = _catalogo(TRANSPORTISTAS_DEMO, transportistas, "Transportista")
+
+    # Pedidos: cantidad por mes y día del mes al azar
+    por_mes = rng.integers(pedidos_mes[0], pedidos_mes[1], size=meses)
+    n_ped = int(por_mes.sum())
+    fecha_ped = np.repeat(inicio_mes, por_mes) + rng.integers(0, 27, size=n_ped) * _DIA_NS
+    df_ped = pd.DataFrame({
+        "id": np.arange(1_000, 1_000 + n_ped),
+        "fecha": _fechas(fecha_ped),
+        "cliente": _categoria(rng, cat_clientes, n_ped),
+        "estado": _categoria(rng, ["Registrado", "Facturado", "Anulado"], n_ped, p=[0.6, 0.35, 0.05]),
+        "monto": rng.integers(200, 1200, size=n_ped).astype(np.float32),
+    })
+
+    # Despachos: uno por pedido, entrega entre un día antes y tres después de lo programado
+    delta_prog = rng.integers(1, 6, size=n_ped)
+    delta_real = np.maximum(0, delta_prog + rng.integers(-1, 4, size=n_ped))
+    fecha_ent = fecha_ped + delta_real * _DIA_NS
+    df_des = pd.DataFrame({
+        "id": np.arange(30_000, 30_000 + n_ped),
+        "fecha_pedido": _fechas(fecha_ped),
+        "fecha_programada": _fechas(fecha_ped + delta_prog * _DIA_NS),
+        "fecha_entrega": _fechas(fecha_ent),
+        "transportista": _categoria(rng, cat_transportistas, n_ped),
+        "estado": _categoria(
+            rng, ["Programado", "En tránsito", "Entregado", "Incidencia"], n_ped, p=[0.1, 0.05, 0.8, 0.05]
+        ),
+    })
+
+    # Reclamos: ~12% de los despachos, hasta una semana después de la entrega
+    n_rec = int(n_ped * 0.12)
+    idx = np.sort(rng.choice(n_ped, size=n_rec, replace=False)) if n_rec else np.empty(0, dtype=np.int64)
+    resuelto = rng.random(n_rec) < 0.75
+    df_rec = pd.DataFrame({
+        "id": np.arange(200_000, 200_000 + n_rec),
+        "fecha": _fechas(fecha_ent[idx] + rng.integers(0, 7, size=n_rec) * _DIA_NS),
+        "cliente": _categoria(rng, cat_clientes, n_rec),
+        "causa": _categoria(rng, CAUSAS_DEMO, n_rec),
+        "estado": pd.Categorical.from_codes(resuelto.astype(np.int8), ["Abierto", "Resuelto"]),
+        "detalle": pd.Categorical.from_codes(np.zeros(n_rec, dtype=np.int8), ["Auto-generado (demo)"]),
+    })
+
+    return {
+        "reclamos": compactar(df_rec),
+        "pedidos": compactar(df_ped),
+        "despachos": tipar("despachos", df_des),
+    }
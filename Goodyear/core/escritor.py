@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Escritor único con group commit para SQLite.
+
+Un hilo en segundo plano toma operaciones de escritura de una cola FIFO y las
+ejecuta en lotes dentro de una sola transacción (un fsync por lote en lugar de
+uno por escritura). Cada operación corre en su propio SAVEPOINT, así un error
+solo descarta esa operación; su resultado o excepción se entrega al llamador
+mediante un ``concurrent.futures.Future`` una vez confirmado el lote. Al haber
+un solo hilo escritor, el orden de las escrituras se preserva.
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import closing
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+# Operación: recibe un cursor y devuelve el resultado de la escritura
+Operacion = Callable[[sqlite3.Cursor], Any]
+
+_FIN = object()
+
+
+class EscritorAgrupado:
+    def __init__(
+        self,
+        abrir: Callable[[], sqlite3.Connection],
+        al_confirmar: Callable[[Set[str]], None],
+        max_lote: int = 64,
+    ) -> None:
+        """
+        Args:
+            abrir: crea la conexión dedicada del hilo escritor
+            al_confirmar: recibe las tablas escritas tras cada commit
+                (p.ej. para invalidar caches)
+            max_lote: máximo de operaciones por transacción
+        """
+        self._abrir = abrir
+        self._al_confirmar = al_confirmar
+        self.max_lote = max_lote
+        self._cola: "queue.Queue[Any]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.operaciones = 0
+
+    def iniciar(self) -> None:
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="escritor-sqlite", daemon=True)
+                self._hilo.start()
+
+    def detener(self, timeout: Optional[float] = None) -> None:
+        """Procesa lo pendiente y termina el hilo."""
+        with self._lock:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is not None and hilo.is_alive():
+            self._cola.put(_FIN)
+            hilo.join(timeout)
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def enviar(self, op: Operacion, tablas: Iterable[str] = ()) -> "Future[Any]":
+        """Encola una escritura; el Future se resuelve cuando su lote hace commit."""
+        fut: "Future[Any]" = Future()
+        self._cola.put((op, tuple(tablas), fut))
+        return fut
+
+    # ------------------------------------------------------------------
+    def _bucle(self) -> None:
+        con = self._abrir()
+        # Control explícito de transacciones (BEGIN/SAVEPOINT/COMMIT)
+        con.isolation_level = None
+        try:
+            while True:
+                item = self._cola.get()
+                if item is _FIN:
+                    return
+                lote = [item]
+                fin = False
+                # Agrupar lo que se acumuló mientras se confirmaba el lote anterior
+                while len(lote) < self.max_lote:
+                    try:
+                        siguiente = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if siguiente is _FIN:
+                        fin = True
+                        break
+                    lote.append(siguiente)
+                self._procesar(con, lote)
+                if fin:
+                    return
+        finally:
+            con.close()
+
+    def _procesar(self, con: sqlite3.Connection, lote: List[Tuple[Operacion, Tuple[str, ...], Future]]) -> None:
+        lote = [item for item in lote if item[2].set_running_or_notify_cancel()]
+        if not lote:
+            return
+        resultados: List[Tuple[Future, bool, Any]] = []
+        tablas: Set[str] = set()
+        try:
+            with closing(con.cursor()) as cur:
+                cur.execute("BEGIN IMMEDIATE")
+                for op, op_tablas, fut in lote:
+                    cur.execute("SAVEPOINT op")
+                    try:
+                        res = op(cur)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO op")
+                        cur.execute("RELEASE op")
+                        resultados.append((fut, False, e))
+                    else:
+                        cur.execute("RELEASE op")
+                        resultados.append((fut, True, res))
+                        tablas.update(op_tablas)
+                cur.execute("COMMIT")
+        except Exception as e:
+            # Falló el lote completo (p.ej. base bloqueada o disco lleno)
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            for _, _, fut in lote:
+                fut.set_exception(e)
+            return
+        self.lotes += 1
+        self.operaciones += len(lote)
+        if tablas:
+            self._al_confirmar(tablas)
+        for fut, ok, valor in resultados:
+            if ok:
+                fut.set_result(valor)
+            else:
+                fut.set_exception(valor)
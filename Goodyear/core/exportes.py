@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de reportes (Excel, PDF y CSV) en segundo plano.
+
+El Excel se escribe con xlsxwriter en modo ``constant_memory``: las filas se
+vuelcan al disco a medida que se escriben, así el consumo de memoria no
+depende del tamaño del libro. ``ColaExportes`` ejecuta cada exportación en
+un pool de procesos (no compite por el GIL con los scripts de Streamlit),
+deja el archivo en EXPORTS_DIR y expone su estado y progreso para que la UI
+lo consulte. Exportes con la misma clave (p.ej. un hash de los filtros) se
+reutilizan.
+
+Los historiales completos (``historial_csv`` / ``historial_parquet``) no
+pasan por pandas en memoria: se leen de la base con un cursor
+(GestorDB.iterar_reporte) y se vuelcan lote a lote, como filas CSV o como
+row groups Parquet, así el pico de memoria no depende del tamaño de la tabla.
+"""
+from __future__ import annotations
+
+import atexit
+import csv
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from config.configuracion import EXPORT_MAX_ARCHIVOS, EXPORT_TRABAJADORES, EXPORTS_DIR
+from core.datos_reporte import COLUMNAS_FECHA, a_fecha
+from core.gestor_reclamos import GestorDB
+
+FILAS_POR_LOTE = 10_000
+MAX_FILAS_HOJA = 1_048_576  # filas de una hoja Excel, encabezado incluido
+
+Destino = Union[str, BinaryIO]
+Progreso = Optional[Callable[[float], None]]
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+LISTO = "listo"
+ERROR = "error"
+
+
+def escribir_excel(
+    destino: Destino,
+    hojas: Dict[str, pd.DataFrame],
+    filas_por_lote: int = FILAS_POR_LOTE,
+    progreso: Progreso = None,
+) -> None:
+    """
+    Escribe una hoja por DataFrame, fila por fila y en lotes.
+
+    Los valores nulos quedan como celdas vacías; las fechas con zona horaria
+    se escriben en UTC sin zona. Un DataFrame que no entra en una hoja se
+    reparte en varias (``nombre_1``, ``nombre_2``, ...). ``progreso`` recibe
+    la fracción escrita (0 a 1) después de cada lote.
+    """
+    total = sum(len(df) for df in hojas.values()) or 1
+    escritas = 0
+    libro = xlsxwriter.Workbook(
+        destino,
+        {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            "nan_inf_to_errors": True,
+        },
+    )
+    try:
+        for nombre, df in _partir_hojas(hojas):
+            hoja = libro.add_worksheet(nombre)
+            hoja.write_row(0, 0, [str(c) for c in df.columns])
+            fila = 1
+            for inicio in range(0, len(df), filas_por_lote):
+                lote = df.iloc[inicio:inicio + filas_por_lote]
+                con_tz = lote.select_dtypes(include=["datetimetz"]).columns
+                if len(con_tz):
+                    lote = lote.assign(**{c: lote[c].dt.tz_convert(None) for c in con_tz})
+                lote = lote.astype(object).where(lote.notna(), None)
+                for valores in lote.itertuples(index=False, name=None):
+                    # En constant_memory una fila fuera de rango no lanza excepción: devuelve -1
+                    if hoja.write_row(fila, 0, valores) == -1:
+                        raise ValueError(f"La hoja {nombre!r} no admite la fila {fila + 1}")
+                    fila += 1
+                escritas += len(lote)
+                if progreso is not None:
+                    progreso(escritas / total)
+    finally:
+        libro.close()
+
+
+def _partir_hojas(hojas: Dict[str, pd.DataFrame]) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """(nombre de hoja, filas) con a lo sumo MAX_FILAS_HOJA - 1 filas de datos por hoja."""
+    por_hoja = MAX_FILAS_HOJA - 1
+    for nombre, df in hojas.items():
+        if len(df) <= por_hoja:
+            yield nombre[:31], df
+            continue
+        for i, inicio in enumerate(range(0, len(df), por_hoja), 1):
+            sufijo = f"_{i}"
+            yield nombre[:31 - len(sufijo)] + sufijo, df.iloc[inicio:inicio + por_hoja]
+
+
+def escribir_csv(
+    destino: Destino,
+    hojas: Dict[str, pd.DataFrame],
+    filas_por_lote: int = FILAS_POR_LOTE,
+    progreso: Progreso = None,
+) -> None:
+    """Un CSV (UTF-8) por DataFrame dentro de un ZIP, escrito en lotes."""
+    total = sum(len(df) for df in hojas.values()) or 1
+    escritas = 0
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for nombre, df in hojas.items():
+            with z.open(f"{nombre}.csv", "w") as crudo, io.TextIOWrapper(crudo, encoding="utf-8", newline="") as f:
+                df.iloc[:0].to_csv(f, index=False)
+                for inicio in range(0, len(df), filas_por_lote):
+                    lote = df.iloc[inicio:inicio + filas_por_lote]
+                    lote.to_csv(f, index=False, header=False)
+                    escritas += len(lote)
+                    if progreso is not None:
+                        progreso(escritas / total)
+
+
+def escribir_pdf(
+    destino: Destino, kpi_dict: Dict[str, Any], notas: Optional[List[str]] = None, progreso: Progreso = None
+) -> None:
+    """Resumen de KPIs (y observaciones opcionales) en una página A4."""
+    c = canvas.Canvas(destino, pagesize=A4)
+    width, height = A4
+    y = height - 50
+
+    c.setFillColorRGB(1, 1, 1)
+    c.setStrokeColorRGB(0.85, 0.9, 1)
+    c.setFillColorRGB(0.12, 0.24, 0.45)
+    c.rect(30, y - 10, width - 60, 36, fill=True, stroke=False)
+    c.setFillColorRGB(1, 1, 1)
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(40, y, "Goodyear – Módulo de Reportería")
+    y -= 40
+
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y, "Indicadores KPI")
+    y -= 18
+    c.setFont("Helvetica", 10)
+    for k, v in kpi_dict.items():
+        c.drawString(50, y, f"• {k}: {v}")
+        y -= 14
+
+    if notas:
+        y -= 8
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(40, y, "Notas / Observaciones")
+        y -= 16
+        c.setFont("Helvetica", 10)
+        for n in notas:
+            c.drawString(50, y, f"- {n}")
+            y -= 13
+            if y < 70:
+                c.showPage()
+                y = height - 50
+                c.setFont("Helvetica", 10)
+
+    y -= 6
+    c.setFont("Helvetica", 9)
+    c.drawString(40, y, f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    c.showPage()
+    c.save()
+
+
+def _lotes_historial(
+    tabla: str, filtros: Optional[Dict[str, Optional[str]]], progreso: Progreso
+) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+    """Lotes de GestorDB.iterar_reporte, informando la fracción leída a ``progreso``."""
+    filtros = filtros or {}
+    db = GestorDB()
+    total = db.contar_reporte(tabla, **filtros) or 1
+    leidas = 0
+    for columnas, filas in db.iterar_reporte(tabla, tam_lote=FILAS_POR_LOTE, **filtros):
+        yield columnas, filas
+        leidas += len(filas)
+        if progreso is not None:
+            progreso(min(1.0, leidas / total))
+
+
+def escribir_historial_csv(
+    destino: Destino, tabla: str, filtros: Optional[Dict[str, Optional[str]]] = None, progreso: Progreso = None
+) -> None:
+    """
+    Tabla de reportería completa (o filtrada: desde, hasta, transportista,
+    estado, causa) como CSV UTF-8, leída de la base por lotes.
+    """
+    crudo = open(destino, "wb") if isinstance(destino, str) else destino
+    f = io.TextIOWrapper(crudo, encoding="utf-8", newline="")
+    try:
+        escritor = csv.writer(f)
+        encabezado = False
+        for columnas, filas in _lotes_historial(tabla, filtros, progreso):
+            if not encabezado:
+                escritor.writerow(columnas)
+                encabezado = True
+            escritor.writerows(filas)
+    finally:
+        f.detach()  # vacía el buffer sin cerrar un destino ajeno
+        if crudo is not destino:
+            crudo.close()
+
+
+def escribir_historial_parquet(
+    destino: Destino, tabla: str, filtros: Optional[Dict[str, Optional[str]]] = None, progreso: Progreso = None
+) -> None:
+    """
+    Como escribir_historial_csv pero en Parquet: un row group por lote, con
+    las fechas como timestamp. El esquema sale de los tipos declarados en la
+    base (GestorDB.tipos_reporte), no de los valores del primer lote, así
+    una columna vacía al principio no cambia de tipo a mitad del archivo.
+    """
+    esquema = pa.schema([pa.field(c, _tipo_arrow(c, d)) for c, d in GestorDB().tipos_reporte(tabla)])
+    escritor = pq.ParquetWriter(destino, esquema, compression="zstd")
+    try:
+        for columnas, filas in _lotes_historial(tabla, filtros, progreso):
+            valores = list(zip(*filas)) if filas else [()] * len(columnas)
+            arreglos = [_arreglo_arrow(v, esquema.field(c).type) for c, v in zip(columnas, valores)]
+            escritor.write_table(pa.Table.from_arrays(arreglos, schema=esquema))
+    finally:
+        escritor.close()
+
+
+def _tipo_arrow(columna: str, declarado: str) -> pa.DataType:
+    """Tipo Arrow según la afinidad SQLite del tipo declarado; fechas como timestamp."""
+    if columna in COLUMNAS_FECHA:
+        return pa.timestamp("ns")
+    declarado = declarado.upper()
+    if "INT" in declarado:
+        return pa.int64()
+    if any(t in declarado for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def _arreglo_arrow(valores: Tuple[Any, ...], tipo: pa.DataType) -> pa.Array:
+    if pa.types.is_timestamp(tipo):
+        return pa.Array.from_pandas(a_fecha(pd.Series(valores, dtype=object)), type=tipo)
+    if pa.types.is_string(tipo):
+        return pa.array([None if v is None else str(v) for v in valores], type=tipo)
+    return pa.array(valores, type=tipo)
+
+
+# tipo -> (función que escribe el archivo, extensión, tipo MIME)
+FORMATOS: Dict[str, Tuple[Callable[..., None], str, str]] = {
+    "xlsx": (escribir_excel, ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": (escribir_pdf, ".pdf", "application/pdf"),
+    "csv": (escribir_csv, ".zip", "application/zip"),
+    "historial_csv": (escribir_historial_csv, ".csv", "text/csv"),
+    "historial_parquet": (escribir_historial_parquet, ".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _generar(tipo: str, ruta: str, args: Tuple[Any, ...]) -> str:
+    """Corre en un proceso del pool: escribe a un archivo parcial y lo renombra al terminar."""
+    parcial = f"{ruta}.parcial"
+    ruta_progreso = f"{ruta}.progreso"
+
+    def progreso(fraccion: float) -> None:
+        with open(ruta_progreso, "w", encoding="utf-8") as f:
+            f.write(f"{fraccion:.4f}")
+
+    try:
+        FORMATOS[tipo][0](parcial, *args, progreso=progreso)
+        os.replace(parcial, ruta)
+    finally:
+        _borrar(parcial)
+        _borrar(ruta_progreso)
+    return ruta
+
+
+class TrabajoExport:
+    def __init__(self, id: str, clave: str, tipo: str, nombre: str, ruta: str, futuro: "Future[str]") -> None:
+        self.id = id
+        self.clave = clave
+        self.tipo = tipo
+        self.nombre = nombre
+        self.ruta = ruta
+        self.futuro = futuro
+        self.creado = time.time()
+
+    @property
+    def estado(self) -> str:
+        if self.futuro.done():
+            return ERROR if self.futuro.cancelled() or self.futuro.exception() else LISTO
+        return EN_PROCESO if self.futuro.running() else PENDIENTE
+
+    def progreso(self) -> float:
+        estado = self.estado
+        if estado == LISTO:
+            return 1.0
+        if estado != EN_PROCESO:
+            return 0.0
+        try:
+            with open(f"{self.ruta}.progreso", encoding="utf-8") as f:
+                return min(1.0, float(f.read() or 0))
+        except (OSError, ValueError):
+            return 0.0
+
+
+class ColaExportes:
+    """
+    Cola de exportaciones atendida por un pool de procesos.
+
+    ``enviar`` devuelve el id del trabajo (o el de uno previo con la misma
+    clave que sigue vigente); ``estado`` informa estado, progreso y ruta. Se
+    conservan como máximo ``max_archivos`` trabajos terminados; al expulsar
+    uno se borra su archivo.
+    """
+
+    def __init__(
+        self,
+        directorio: Union[str, Path] = EXPORTS_DIR,
+        trabajadores: int = EXPORT_TRABAJADORES,
+        max_archivos: int = EXPORT_MAX_ARCHIVOS,
+    ) -> None:
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.max_archivos = max_archivos
+        self.trabajadores = trabajadores
+        self._pool = self._crear_pool()
+        self._trabajos: "OrderedDict[str, TrabajoExport]" = OrderedDict()
+        self._por_clave: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._limpiar_huerfanos()
+        atexit.register(self.cerrar)
+
+    def enviar(self, clave: str, tipo: str, args: Tuple[Any, ...], nombre: str) -> str:
+        """
+        Encola una exportación.
+
+        Args:
+            clave: identifica el contenido (mismos filtros y datos, misma clave)
+            tipo: "xlsx", "pdf" o "csv" (ver FORMATOS)
+            args: argumentos del escritor después del destino (deben poder picklearse)
+            nombre: nombre de archivo sugerido para la descarga
+        """
+        with self._lock:
+            previo = self._trabajos.get(self._por_clave.get(clave, ""))
+            if previo is not None and previo.estado != ERROR and (
+                previo.estado != LISTO or os.path.exists(previo.ruta)
+            ):
+                return previo.id
+            id = uuid.uuid4().hex
+            ruta = str(self.directorio / f"{id}{FORMATOS[tipo][1]}")
+            try:
+                futuro = self._pool.submit(_generar, tipo, ruta, args)
+            except BrokenProcessPool:
+                # Un proceso murió (p.ej. sin memoria): el pool queda inservible, se recrea
+                self._pool = self._crear_pool()
+                futuro = self._pool.submit(_generar, tipo, ruta, args)
+            self._trabajos[id] = TrabajoExport(id, clave, tipo, nombre, ruta, futuro)
+            self._por_clave[clave] = id
+            expulsados = self._expulsar()
+        for t in expulsados:
+            _borrar(t.ruta)
+        return id
+
+    def estado(self, id: str) -> Optional[Dict[str, Any]]:
+        t = self._trabajos.get(id)
+        if t is None:
+            return None
+        estado = t.estado
+        error = t.futuro.exception() if estado == ERROR and not t.futuro.cancelled() else None
+        return {
+            "id": t.id,
+            "tipo": t.tipo,
+            "nombre": t.nombre,
+            "mime": FORMATOS[t.tipo][2],
+            "estado": estado,
+            "progreso": t.progreso(),
+            "ruta": t.ruta if estado == LISTO else None,
+            "error": str(error) if error else None,
+        }
+
+    def cerrar(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _crear_pool(self) -> ProcessPoolExecutor:
+        # spawn: los procesos no heredan hilos ni conexiones del servidor
+        return ProcessPoolExecutor(max_workers=self.trabajadores, mp_context=multiprocessing.get_context("spawn"))
+
+    def _limpiar_huerfanos(self, max_edad_s: float = 86_400) -> None:
+        """Borra archivos viejos que dejaron procesos anteriores (ya nadie los sigue)."""
+        limite = time.time() - max_edad_s
+        for archivo in self.directorio.iterdir():
+            try:
+                if archivo.is_file() and archivo.stat().st_mtime < limite:
+                    archivo.unlink()
+            except OSError:
+                pass
+
+    def _expulsar(self) -> List[TrabajoExport]:
+        """Quita los trabajos terminados más antiguos por encima del máximo (requiere self._lock)."""
+        terminados = [t for t in self._trabajos.values() if t.futuro.done()]
+        expulsados = terminados[: max(0, len(terminados) - self.max_archivos)]
+        for t in expulsados:
+            del self._trabajos[t.id]
+            if self._por_clave.get(t.clave) == t.id:
+                del self._por_clave[t.clave]
+        return expulsados
+
+
+def _borrar(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de filtros de la reportería.
+
+Se construye una vez por versión de los datos: ordena cada tabla por su
+columna de fecha, guarda esas fechas como int64 para resolver los rangos
+con búsqueda binaria y factoriza las columnas categóricas. Filtrar por
+fechas devuelve una rebanada (vista) de la tabla ordenada; solo si además
+hay filtros por categoría se materializan las filas seleccionadas. Las
+máscaras por valor se memorizan entre llamadas.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columna de fecha por la que se filtra (y ordena) cada tabla
+COLUMNA_FECHA = {"reclamos": "fecha", "pedidos": "fecha", "despachos": "fecha_entrega"}
+# Columnas filtrables por igualdad en cada tabla
+COLUMNAS_CATEGORIA = {"despachos": ("transportista", "estado"), "reclamos": ("causa",)}
+
+_versiones = itertools.count(1)
+
+
+class _Tabla:
+    def __init__(self, df: pd.DataFrame, col_fecha: Optional[str], categorias: Tuple[str, ...]) -> None:
+        # Los frames del cargador ya vienen sin zona horaria (datos_reporte.tipar)
+        con_tz = df.select_dtypes(include=["datetimetz"]).columns
+        if len(con_tz):
+            df = df.assign(**{c: df[c].dt.tz_localize(None) for c in con_tz})
+        self.fechas: Optional[np.ndarray] = None
+        if col_fecha and col_fecha in df.columns:
+            df = df.sort_values(col_fecha, kind="stable", na_position="last", ignore_index=True)
+            validas = df[col_fecha].notna().to_numpy()
+            self.fechas = df[col_fecha].to_numpy("datetime64[ns]")[validas].view("int64")
+        self.df = df
+        # columna -> (códigos por fila, {valor: código}); -1 = nulo
+        self.codigos: Dict[str, Tuple[np.ndarray, Dict[str, int]]] = {}
+        for col in categorias:
+            if col in df.columns:
+                codigos, valores = pd.factorize(df[col])
+                self.codigos[col] = (codigos, {str(v): i for i, v in enumerate(valores)})
+        self._mascaras: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def rango(self, desde: Optional[int], hasta: Optional[int]) -> Tuple[int, int]:
+        """Posiciones [i, j) de las filas con desde <= fecha < hasta."""
+        if self.fechas is None or (desde is None and hasta is None):
+            return 0, len(self.df)
+        i = 0 if desde is None else int(np.searchsorted(self.fechas, desde, side="left"))
+        j = len(self.fechas) if hasta is None else int(np.searchsorted(self.fechas, hasta, side="left"))
+        return i, max(i, j)
+
+    def mascara(self, col: str, valor: str) -> np.ndarray:
+        clave = (col, valor)
+        m = self._mascaras.get(clave)
+        if m is None:
+            codigos, mapa = self.codigos[col]
+            codigo = mapa.get(valor)
+            m = codigos == codigo if codigo is not None else np.zeros(len(codigos), dtype=bool)
+            self._mascaras[clave] = m
+        return m
+
+
+class MotorFiltros:
+    """Índices de filtrado sobre los DataFrames de reportería (solo lectura)."""
+
+    def __init__(self, dfs: Dict[str, pd.DataFrame]) -> None:
+        self.version = next(_versiones)
+        self._tablas = {
+            t: _Tabla(df, COLUMNA_FECHA.get(t), COLUMNAS_CATEGORIA.get(t, ())) for t, df in dfs.items()
+        }
+
+    @property
+    def tablas(self) -> Dict[str, pd.DataFrame]:
+        return {t: tabla.df for t, tabla in self._tablas.items()}
+
+    def rango_fechas(self) -> Optional[Tuple[date, date]]:
+        """Primera y última fecha entre todas las tablas (None si no hay)."""
+        extremos = [
+            (tabla.fechas[0], tabla.fechas[-1]) for tabla in self._tablas.values()
+            if tabla.fechas is not None and len(tabla.fechas)
+        ]
+        if not extremos:
+            return None
+        fmin = min(e[0] for e in extremos)
+        fmax = max(e[1] for e in extremos)
+        return pd.Timestamp(fmin).date(), pd.Timestamp(fmax).date()
+
+    def opciones(self, tabla: str, col: str) -> List[str]:
+        """Valores distintos (no nulos) de una columna categórica, ordenados."""
+        t = self._tablas.get(tabla)
+        if t is None or col not in t.codigos:
+            return []
+        return sorted(t.codigos[col][1])
+
+    def clave(
+        self, desde: Optional[date] = None, hasta: Optional[date] = None, **iguales: Optional[str]
+    ) -> Tuple:
+        """
+        Clave normalizada de un filtro: (versión, desde, hasta, ((columna, valor), ...)).
+
+        Dos filtros con el mismo resultado dan la misma clave: fechas como
+        ``date``, sin valores None ni columnas que ninguna tabla filtra.
+        """
+        filtrables = {c for t in self._tablas.values() for c in t.codigos}
+        return (
+            self.version,
+            pd.Timestamp(desde).date() if desde is not None else None,
+            pd.Timestamp(hasta).date() if hasta is not None else None,
+            tuple(sorted((c, str(v)) for c, v in iguales.items() if v is not None and c in filtrables)),
+        )
+
+    def filtrar(
+        self,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        **iguales: Optional[str],
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Filtra todas las tablas por rango de fechas (ambos extremos inclusive)
+        y por igualdad en las columnas categóricas que cada tabla tenga
+        (``transportista=``, ``estado=``, ``causa=``; None = sin filtro).
+        """
+        d1 = pd.Timestamp(desde).value if desde is not None else None
+        d2 = (pd.Timestamp(hasta) + pd.Timedelta(days=1)).value if hasta is not None else None
+        resultado: Dict[str, pd.DataFrame] = {}
+        for nombre, tabla in self._tablas.items():
+            i, j = tabla.rango(d1, d2)
+            vista = tabla.df.iloc[i:j]
+            mascara: Optional[np.ndarray] = None
+            for col, valor in iguales.items():
+                if valor is None or col not in tabla.codigos:
+                    continue
+                m = tabla.mascara(col, valor)[i:j]
+                mascara = m if mascara is None else mascara & m
+            resultado[nombre] = vista if mascara is None else vista[mascara]
+        return resultado
+
+
+_motores: "OrderedDict[Tuple[int, ...], Tuple[Dict[str, pd.DataFrame], MotorFiltros]]" = OrderedDict()
+_motores_lock = threading.Lock()
+MAX_MOTORES = 4
+
+
+def motor_para(dfs: Dict[str, pd.DataFrame]) -> MotorFiltros:
+    """
+    Devuelve el motor de los DataFrames dados, construyéndolo solo si cambian.
+
+    La clave es la identidad de los frames (el cargador incremental y el modo
+    demo devuelven los mismos objetos mientras los datos no cambien); se
+    guardan referencias a ellos para que sus ids no se reutilicen.
+    """
+    clave = tuple(id(dfs[t]) for t in sorted(dfs))
+    with _motores_lock:
+        entrada = _motores.get(clave)
+        if entrada is not None:
+            _motores.move_to_end(clave)
+            return entrada[1]
+    motor = MotorFiltros(dfs)
+    with _motores_lock:
+        _motores[clave] = (dict(dfs), motor)
+        while len(_motores) > MAX_MOTORES:
+            _motores.popitem(last=False)
+    return motor
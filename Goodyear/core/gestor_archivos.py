@@ -17,6 +17,9 @@ def guardar_imagen(contenido: bytes, nombre_original: str, reclamo_id: int) -> s
         f.write(contenido)
     return str(ruta)
 
+def eliminar_imagen(ruta: str) -> None:
+    Path(ruta).unlink(missing_ok=True)
+
 def listar_archivos_reclamo(reclamo_id: int) -> List[str]:
     asegurar_directorio()
     patron = f"reclamo_{reclamo_id}_"
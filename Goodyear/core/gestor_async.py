@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+AsyncGestorDB: fachada asyncio sobre GestorDB.
+
+Cada método de GestorDB (y autenticar/crear_usuario de core.seguridad) está
+disponible como corrutina. Las llamadas se ejecutan en un ThreadPoolExecutor
+acotado cuyos hilos usan su propio pool de conexiones, de modo que un servicio
+async o un job en segundo plano nunca bloquea el event loop con SQLite ni
+compite por conexiones con la UI de Streamlit. Varias lecturas pueden
+lanzarse en paralelo con ``asyncio.gather``. Los métodos que devuelven
+generadores (iterar_reporte) son iteradores async que leen cada lote en el
+executor.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config.configuracion import DB_ASYNC_HILOS, DB_PATH
+from core import seguridad
+from core.gestor_reclamos import GestorDB, PoolConexiones, usar_pool_en_hilo
+
+
+class AsyncGestorDB:
+    """
+    Uso::
+
+        async with AsyncGestorDB() as db:
+            reclamos = await db.listar_reclamos_cliente(cliente_id, limit=20)
+            imagenes, mensajes = await asyncio.gather(
+                db.listar_imagenes_bulk(ids), db.listar_mensajes_bulk(ids)
+            )
+    """
+
+    def __init__(self, max_hilos: int = DB_ASYNC_HILOS, ruta: str = DB_PATH) -> None:
+        self._db = GestorDB()
+        self._pool = PoolConexiones(ruta, tamano=max_hilos)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_hilos,
+            thread_name_prefix="gestordb-async",
+            initializer=usar_pool_en_hilo,
+            initargs=(self._pool,),
+        )
+
+    async def _ejecutar(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def __getattr__(self, nombre: str) -> Callable[..., Any]:
+        # Solo se llama para atributos no definidos: refleja los métodos públicos de GestorDB
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        metodo = getattr(self._db, nombre)
+        # Un generador solo se crearía en el executor y se recorrería en el event loop
+        if not callable(metodo) or inspect.isgeneratorfunction(metodo):
+            raise AttributeError(nombre)
+
+        @functools.wraps(metodo)
+        async def envoltura(*args: Any, **kwargs: Any) -> Any:
+            return await self._ejecutar(metodo, *args, **kwargs)
+
+        return envoltura
+
+    # ------------------- Seguridad -----------------------
+    async def autenticar(self, username: str, password: str) -> Optional[Tuple[int, str]]:
+        return await self._ejecutar(seguridad.autenticar, username, password)
+
+    async def crear_usuario(self, username: str, email: str, password: str, rol: str) -> int:
+        return await self._ejecutar(seguridad.crear_usuario, username, email, password, rol)
+
+    # ------------------- Compuestos ----------------------
+    async def cargar_reclamos_cliente(
+        self, cliente_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Página de reclamos del cliente con imágenes y mensajes (cargados en paralelo)."""
+        reclamos = await self._ejecutar(self._db.listar_reclamos_cliente, cliente_id, after_id, limit)
+        ids = [r["id"] for r in reclamos]
+        imagenes, mensajes = await asyncio.gather(
+            self._ejecutar(self._db.listar_imagenes_bulk, ids),
+            self._ejecutar(self._db.listar_mensajes_bulk, ids),
+        )
+        return [dict(r, imagenes=imagenes[r["id"]], mensajes=mensajes[r["id"]]) for r in reclamos]
+
+    async def iterar_reporte(
+        self,
+        tabla: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        tam_lote: int = 5_000,
+        **iguales: Optional[str],
+    ) -> AsyncIterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        """GestorDB.iterar_reporte como iterador async: cada lote se lee en el executor."""
+        lotes = self._db.iterar_reporte(tabla, desde, hasta, tam_lote, **iguales)
+        fin = object()
+        try:
+            while True:
+                lote = await self._ejecutar(next, lotes, fin)
+                if lote is fin:
+                    return
+                yield lote
+        finally:
+            await self._ejecutar(lotes.close)
+
+    # ------------------- Ciclo de vida -------------------
+    async def cerrar(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        self._pool.cerrar()
+
+    async def __aenter__(self) -> "AsyncGestorDB":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.cerrar()
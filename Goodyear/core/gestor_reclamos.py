@@ -5,156 +5,533 @@ Provee los métodos usados por las interfaces (reclamos, internos, chat, pedidos
 """
 from __future__ import annotations
 
+import atexit
+import functools
+import queue
+import re
 import sqlite3
-from contextlib import closing
+import threading
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from types import GeneratorType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from config.configuracion import (
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_MAX_ENTRADAS,
+    DB_ESCRITOR_AGRUPADO,
+    DB_ESCRITOR_MAX_LOTE,
     DB_PATH,
+    DB_POOL_SIZE,
     ESTADOS,
     ESTADO_RECIBIDO,
+    ESTADO_RESUELTO,
+)
+from core.cache import CacheConsultas
+from core.escritor import EscritorAgrupado
+from core.gestor_archivos import eliminar_imagen, guardar_imagen
+from core.migraciones import (
+    SQL_RECONSTRUIR_ROLLUPS,
+    VERSION_ACTUAL,
+    aplicar_migraciones,
+    version_esquema,
 )
 
 ISO = "%Y-%m-%dT%H:%M:%S"
+MAX_PARAMS = 500  # ids por consulta IN (...) en las lecturas bulk
+
+# Pragmas por conexión (journal_mode=WAL es persistente en el archivo, el resto no)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
 
 
-def _connect() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH, check_same_thread=False)
+def abrir_conexion(ruta: str = DB_PATH) -> sqlite3.Connection:
+    """Abre una conexión nueva con row_factory y los PRAGMAS de la app."""
+    Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(ruta, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000)
     con.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        con.execute(pragma)
     return con
 
 
-def _ensure_schema() -> None:
-    with closing(_connect()) as con, closing(con.cursor()) as cur:
-        # usuarios (referencia básica)
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT UNIQUE NOT NULL,
-                email TEXT,
-                password_hash TEXT,
-                rol TEXT NOT NULL
-            )
-            """
-        )
-        # reclamos del cliente
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS reclamos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                descripcion TEXT NOT NULL,
-                estado TEXT NOT NULL,
-                fecha TEXT NOT NULL,
-                FOREIGN KEY (cliente_id) REFERENCES usuarios(id)
-            )
-            """
-        )
-        # imágenes asociadas a reclamos
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS imagenes_reclamo (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                reclamo_id INTEGER NOT NULL,
-                ruta TEXT NOT NULL,
-                FOREIGN KEY (reclamo_id) REFERENCES reclamos(id)
-            )
-            """
-        )
-        # mensajes de chat por reclamo
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS mensajes_reclamo (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                reclamo_id INTEGER NOT NULL,
-                usuario_id INTEGER NOT NULL,
-                tipo_usuario TEXT NOT NULL,  -- 'cliente' | 'interno'
-                mensaje TEXT NOT NULL,
-                fecha_envio TEXT NOT NULL,
-                FOREIGN KEY (reclamo_id) REFERENCES reclamos(id),
-                FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-            )
-            """
-        )
-        # pedidos del cliente (simple)
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS pedidos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                detalle TEXT NOT NULL,
-                fecha TEXT NOT NULL,
-                estado TEXT DEFAULT 'Nuevo',
-                FOREIGN KEY (cliente_id) REFERENCES usuarios(id)
-            )
-            """
-        )
-        # despachos asociados a pedidos (simple)
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS despachos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pedido_id INTEGER NOT NULL,
-                fecha_salida TEXT,
-                fecha_entrega TEXT,
-                transportista TEXT,
-                estado TEXT,
-                on_time INTEGER DEFAULT 1,
-                FOREIGN KEY (pedido_id) REFERENCES pedidos(id)
+class PoolConexiones:
+    """
+    Pool acotado de conexiones SQLite reutilizables.
+
+    Las conexiones se abren y configuran una sola vez; cada hilo toma una
+    prestada con ``conexion()`` y la devuelve al salir del bloque. Si el hilo
+    ya tiene una conexión prestada (llamadas anidadas) se reutiliza la misma.
+    """
+
+    def __init__(self, ruta: str, tamano: int = DB_POOL_SIZE) -> None:
+        self._ruta = ruta
+        self._libres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._todas: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # PRAGMA data_version visto por última vez en cada conexión (ver hubo_commits_ajenos)
+        self._versiones: Dict[sqlite3.Connection, int] = {}
+
+    def _abrir(self) -> sqlite3.Connection:
+        con = abrir_conexion(self._ruta)
+        with self._lock:
+            self._todas.append(con)
+        return con
+
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        actual = getattr(self._local, "con", None)
+        if actual is not None:
+            yield actual
+            return
+        self._cupos.acquire()
+        try:
+            try:
+                con = self._libres.get_nowait()
+            except queue.Empty:
+                con = self._abrir()
+            self._local.con = con
+            try:
+                yield con
+            finally:
+                self._local.con = None
+                # No devolver al pool una transacción a medio camino
+                if con.in_transaction:
+                    con.rollback()
+                self._libres.put(con)
+        finally:
+            self._cupos.release()
+
+    @contextmanager
+    def conexion_dedicada(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexión propia, fuera del pool y del estado por hilo, para lecturas
+        que se consumen de a poco (generadores): no la reutilizan las llamadas
+        a ``conexion()`` hechas mientras tanto y puede consumirse desde otro
+        hilo. Se cierra al salir del bloque.
+        """
+        con = abrir_conexion(self._ruta)
+        try:
+            yield con
+        finally:
+            con.close()
+
+    def hubo_commits_ajenos(self, con: sqlite3.Connection) -> bool:
+        """
+        True si otra conexión hizo commit desde la última llamada con ``con``
+        (siempre True la primera vez). ``con`` debe estar prestada por este pool.
+        """
+        dv = con.execute("PRAGMA data_version").fetchone()[0]
+        if self._versiones.get(con) == dv:
+            return False
+        self._versiones[con] = dv
+        return True
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._versiones.clear()
+            for con in self._todas:
+                try:
+                    con.close()
+                except sqlite3.Error:
+                    pass
+            self._todas.clear()
+        while not self._libres.empty():
+            self._libres.get_nowait()
+
+
+_pool = PoolConexiones(DB_PATH)
+atexit.register(_pool.cerrar)
+_hilo = threading.local()
+
+
+def usar_pool_en_hilo(pool: Optional[PoolConexiones]) -> None:
+    """Hace que el hilo actual tome sus conexiones de ``pool`` (None = pool compartido)."""
+    _hilo.pool = pool
+
+
+def _pool_hilo() -> PoolConexiones:
+    """Pool del hilo actual (usar_pool_en_hilo) o el compartido."""
+    return getattr(_hilo, "pool", None) or _pool
+
+
+def conexion():
+    """Context manager que presta una conexión del pool del hilo (o del compartido)."""
+    return _pool_hilo().conexion()
+
+
+def conexion_dedicada():
+    """Context manager con una conexión no compartida (ver PoolConexiones.conexion_dedicada)."""
+    return _pool_hilo().conexion_dedicada()
+
+
+def _lotes(ids: List[int], tamano: int = MAX_PARAMS) -> Iterator[List[int]]:
+    """Divide una lista de ids en lotes que respetan el límite de parámetros de SQLite."""
+    for i in range(0, len(ids), tamano):
+        yield ids[i : i + tamano]
+
+
+# Reclamos que coinciden con una búsqueda: descripción o chat (FTS5, rango bm25)
+# y reclamos de clientes cuyo usuario contiene el texto (tabla pequeña).
+# Parámetros: (consulta_fts, consulta_fts, like_usuario)
+_SQL_COINCIDENCIAS = """
+    SELECT rowid AS reclamo_id, bm25(reclamos_fts) AS rango
+    FROM reclamos_fts WHERE reclamos_fts MATCH ?
+    UNION ALL
+    SELECT m.reclamo_id, bm25(mensajes_fts)
+    FROM mensajes_fts JOIN mensajes_reclamo m ON m.id = mensajes_fts.rowid
+    WHERE mensajes_fts MATCH ?
+    UNION ALL
+    SELECT r.id, 0.0
+    FROM usuarios u JOIN reclamos r ON r.cliente_id = u.id
+    WHERE u.usuario LIKE ?
+"""
+
+
+def consulta_fts(texto: str) -> str:
+    """Convierte texto libre en una consulta FTS5 de prefijos (todas las palabras)."""
+    palabras = re.findall(r"\w+", texto or "")
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+def _paginar(
+    q: List[str], params: List[Any], after_id: Optional[int], limit: Optional[int], col: str = "id"
+) -> None:
+    """
+    Completa una consulta con paginación por keyset en orden descendente.
+
+    ``q`` debe terminar en una cláusula WHERE; ``after_id`` es el último id de
+    la página anterior (la siguiente página trae ids menores).
+    """
+    if after_id is not None:
+        q.append(f"AND {col} < ?")
+        params.append(int(after_id))
+    q.append(f"ORDER BY {col} DESC")
+    if limit is not None:
+        q.append("LIMIT ?")
+        params.append(int(limit))
+
+
+_cache = CacheConsultas(DB_CACHE_MAX_ENTRADAS)
+
+
+def _cacheado(*tablas: str):
+    """
+    Read-through sobre ``_cache`` para un método de lectura de GestorDB.
+
+    La clave es (método, argumentos); ``tablas`` son las tablas consultadas,
+    cuyas escrituras invalidan la entrada. Los resultados cacheados se
+    comparten entre llamadas y deben tratarse como de solo lectura.
+    """
+
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(self, *args, **kwargs):
+            # Iterables de ids (métodos bulk) -> tupla, para que la clave sea hashable
+            args = tuple(
+                tuple(a) if isinstance(a, (list, set, frozenset, GeneratorType)) else a for a in args
             )
-            """
-        )
+            clave = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            _revalidar_cache()
+            return _cache.obtener(clave, tablas, lambda: fn(self, *args, **kwargs))
+
+        return envoltura
+
+    return decorador
+
+
+_escritor = EscritorAgrupado(
+    abrir=abrir_conexion,
+    al_confirmar=lambda tablas: _cache.invalidar(*tablas),
+    max_lote=DB_ESCRITOR_MAX_LOTE,
+)
+atexit.register(_escritor.detener)
+
+
+def activar_escritor_agrupado() -> None:
+    """Envía las escrituras de GestorDB al hilo escritor con group commit."""
+    _escritor.iniciar()
+
+
+def desactivar_escritor_agrupado() -> None:
+    _escritor.detener()
+
+
+def _escribir(op: Callable[[sqlite3.Cursor], Any], *tablas: str) -> Any:
+    """
+    Ejecuta una escritura y devuelve su resultado.
+
+    Con el escritor agrupado activo, la operación se encola y se espera su
+    Future; si no, se ejecuta en una conexión del pool con su propio commit.
+    En ambos casos el cache de ``tablas`` se invalida tras el commit.
+    """
+    if _escritor.activo:
+        return _escritor.enviar(op, tablas).result()
+    with conexion() as con, closing(con.cursor()) as cur:
+        res = op(cur)
         con.commit()
+    _cache.invalidar(*tablas)
+    return res
+
+
+def _revalidar_cache() -> None:
+    """
+    Detecta escrituras de otras conexiones/procesos antes de servir del cache.
+
+    ``PRAGMA data_version`` solo cambia si otra conexión hizo commit desde la
+    última consulta en esta conexión; en ese caso se leen las versiones por
+    tabla (versiones_tabla) y se invalidan las tablas que cambiaron.
+    """
+    pool = _pool_hilo()
+    with pool.conexion() as con:
+        if not pool.hubo_commits_ajenos(con):
+            return
+        versiones = {t: int(v) for t, v in con.execute("SELECT tabla, version FROM versiones_tabla")}
+    _cache.sincronizar_versiones(versiones)
+
+
+def invalidar_cache(*tablas: str) -> None:
+    """Invalida las consultas cacheadas de ``tablas`` (para escrituras fuera de GestorDB)."""
+    _cache.invalidar(*tablas)
+
+
+_esquema_listo = False
+_esquema_lock = threading.Lock()
+
+
+def _rango_fechas(
+    q: List[str], params: List[Any], col: str, desde: Optional[str], hasta: Optional[str]
+) -> None:
+    """Agrega ``desde <= col < hasta + 1 día`` (fechas ISO 'YYYY-MM-DD', ambas inclusivas)."""
+    if desde:
+        q.append(f"AND {col} >= ?")
+        params.append(str(desde))
+    if hasta:
+        q.append(f"AND {col} < date(?, '+1 day')")
+        params.append(str(hasta))
+
+
+def _filtro_rollup(
+    q: List[str],
+    params: List[Any],
+    desde: Optional[str],
+    hasta: Optional[str],
+    **iguales: Optional[str],
+) -> None:
+    """Filtros sobre un rollup diario: ``desde <= dia <= hasta`` y columnas = valor."""
+    if desde:
+        q.append("AND dia >= ?")
+        params.append(str(desde))
+    if hasta:
+        q.append("AND dia <= ?")
+        params.append(str(hasta))
+    for col, valor in iguales.items():
+        if valor:
+            q.append(f"AND {col} = ?")
+            params.append(valor)
+
+
+# Lecturas de la reportería (alias t para filtrar por id en cargas incrementales)
+_SQL_REPORTE = {
+    "reclamos": "SELECT t.id, t.cliente_id, t.descripcion, t.estado, t.fecha, t.causa FROM reclamos t",
+    "pedidos": "SELECT t.id, t.cliente_id, t.detalle, t.fecha, t.estado FROM pedidos t",
+    "despachos": (
+        "SELECT t.id, t.pedido_id, p.fecha AS fecha_pedido, t.fecha_salida, t.fecha_entrega,"
+        " t.transportista, t.estado, t.on_time"
+        " FROM despachos t LEFT JOIN pedidos p ON p.id = t.pedido_id"
+    ),
+}
+# Filtros de iterar_reporte / contar_reporte: columna de fecha y columnas por igualdad
+_FECHA_REPORTE = {"reclamos": "t.fecha", "pedidos": "t.fecha", "despachos": "t.fecha_entrega"}
+_IGUALES_REPORTE = {"reclamos": ("causa",), "despachos": ("transportista", "estado")}
+# Columnas de _SQL_REPORTE que vienen de otra tabla: alias -> (tabla, columna)
+_ORIGEN_REPORTE = {"fecha_pedido": ("pedidos", "fecha")}
+
+
+def _sql_reporte_filtrado(
+    tabla: str, desde: Optional[str], hasta: Optional[str], iguales: Dict[str, Optional[str]]
+) -> Tuple[List[str], List[Any]]:
+    """SELECT de _SQL_REPORTE[tabla] con rango de fechas e igualdades (las que la tabla tenga)."""
+    q = [_SQL_REPORTE[tabla], "WHERE 1=1"]
+    params: List[Any] = []
+    _rango_fechas(q, params, _FECHA_REPORTE[tabla], desde, hasta)
+    for col in _IGUALES_REPORTE.get(tabla, ()):
+        if iguales.get(col):
+            q.append(f"AND t.{col} = ?")
+            params.append(iguales[col])
+    return q, params
+
+
+def _ensure_schema() -> None:
+    """
+    Lleva la base a la última versión del esquema (ver core.migraciones).
+
+    Se ejecuta una vez por proceso: las llamadas siguientes solo leen un flag.
+    La primera vez basta con ``PRAGMA user_version`` si la base ya está al día.
+    """
+    global _esquema_listo
+    if _esquema_listo:
+        return
+    with _esquema_lock:
+        if _esquema_listo:
+            return
+        with conexion() as con:
+            if version_esquema(con) < VERSION_ACTUAL:
+                aplicar_migraciones(con)
+        _esquema_listo = True
 
 
 class GestorDB:
-    def __init__(self) -> None:
-        _ensure_schema()
+    """
+    Handle compartido de acceso a datos.
+
+    Todas las instancias son el mismo objeto (las conexiones viven en el pool
+    del módulo), así que ``GestorDB()`` puede llamarse en cada render sin costo.
+    """
+
+    _instancia: Optional["GestorDB"] = None
+
+    def __new__(cls) -> "GestorDB":
+        if cls._instancia is None:
+            _ensure_schema()
+            cls._instancia = super().__new__(cls)
+        return cls._instancia
+
+    def estadisticas_cache(self) -> Dict[str, Any]:
+        """Contadores del cache de consultas (hits, misses, entradas, ...)."""
+        return _cache.estadisticas()
+
+    # --------------------- Usuarios ----------------------
+    @_cacheado("usuarios")
+    def obtener_id_usuario(self, usuario: str) -> Optional[int]:
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute("SELECT id FROM usuarios WHERE usuario=?", (usuario,))
+            row = cur.fetchone()
+            return int(row[0]) if row else None
+
+    @_cacheado("usuarios")
+    def listar_usuarios(self) -> List[Dict[str, Any]]:
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute("SELECT id, usuario, rol, email FROM usuarios ORDER BY id")
+            return [dict(row) for row in cur.fetchall()]
 
     # ---------------- Reclamos (cliente) -----------------
     def crear_reclamo(self, cliente_id: int, descripcion: str) -> int:
         now = datetime.now().strftime(ISO)
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+
+        def op(cur: sqlite3.Cursor) -> int:
             cur.execute(
                 "INSERT INTO reclamos (cliente_id, descripcion, estado, fecha) VALUES (?,?,?,?)",
                 (cliente_id, descripcion, ESTADO_RECIBIDO, now),
             )
-            rid = cur.lastrowid
-            con.commit()
-            return int(rid)
+            return int(cur.lastrowid)
+
+        return _escribir(op, "reclamos")
 
-    def listar_reclamos_cliente(self, cliente_id: int) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+    def crear_reclamo_con_imagenes(
+        self, cliente_id: int, descripcion: str, imagenes: Sequence[Tuple[bytes, str]]
+    ) -> Tuple[int, List[str]]:
+        """
+        Registra un reclamo y sus imágenes adjuntas en una sola transacción.
+
+        ``imagenes`` es una secuencia de (contenido, nombre_original) ya
+        validados. Los archivos se escriben dentro de la misma operación de
+        escritura, antes del commit; si la operación o el commit fallan se
+        eliminan los archivos ya escritos.
+        Devuelve (id del reclamo, rutas guardadas).
+        """
+        now = datetime.now().strftime(ISO)
+        rutas: List[str] = []
+
+        def op(cur: sqlite3.Cursor) -> int:
             cur.execute(
-                "SELECT id, descripcion, estado, fecha FROM reclamos WHERE cliente_id=? ORDER BY id DESC",
-                (cliente_id,),
+                "INSERT INTO reclamos (cliente_id, descripcion, estado, fecha) VALUES (?,?,?,?)",
+                (cliente_id, descripcion, ESTADO_RECIBIDO, now),
             )
+            rid = int(cur.lastrowid)
+            for contenido, nombre in imagenes:
+                rutas.append(guardar_imagen(contenido, nombre, rid))
+            cur.executemany(
+                "INSERT INTO imagenes_reclamo (reclamo_id, ruta) VALUES (?,?)",
+                [(rid, ruta) for ruta in rutas],
+            )
+            return rid
+
+        try:
+            rid = _escribir(op, "reclamos", "imagenes_reclamo")
+        except Exception:
+            for ruta in rutas:
+                eliminar_imagen(ruta)
+            raise
+        return rid, rutas
+
+    @_cacheado("reclamos")
+    def listar_reclamos_cliente(
+        self, cliente_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        q = ["SELECT id, descripcion, estado, fecha FROM reclamos WHERE cliente_id=?"]
+        params: List[Any] = [cliente_id]
+        _paginar(q, params, after_id, limit)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
             return [dict(row) for row in cur.fetchall()]
 
     def registrar_imagen(self, reclamo_id: int, ruta: str) -> None:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+        def op(cur: sqlite3.Cursor) -> None:
             cur.execute(
                 "INSERT INTO imagenes_reclamo (reclamo_id, ruta) VALUES (?,?)",
                 (reclamo_id, ruta),
             )
-            con.commit()
 
+        _escribir(op, "imagenes_reclamo")
+
+    @_cacheado("imagenes_reclamo")
     def listar_imagenes(self, reclamo_id: int) -> List[str]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+        with conexion() as con, closing(con.cursor()) as cur:
             cur.execute(
                 "SELECT ruta FROM imagenes_reclamo WHERE reclamo_id=? ORDER BY id ASC",
                 (reclamo_id,),
             )
             return [row[0] for row in cur.fetchall()]
 
+    @_cacheado("imagenes_reclamo")
+    def listar_imagenes_bulk(self, reclamo_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """Rutas de imágenes de varios reclamos en una consulta por lote de ids."""
+        ids = list(dict.fromkeys(int(i) for i in reclamo_ids))
+        res: Dict[int, List[str]] = {i: [] for i in ids}
+        with conexion() as con, closing(con.cursor()) as cur:
+            for lote in _lotes(ids):
+                marcas = ",".join("?" * len(lote))
+                cur.execute(
+                    f"SELECT reclamo_id, ruta FROM imagenes_reclamo WHERE reclamo_id IN ({marcas}) "
+                    "ORDER BY reclamo_id, id ASC",
+                    lote,
+                )
+                for rid, ruta in cur.fetchall():
+                    res[rid].append(ruta)
+        return res
+
     # ------------- Reclamos (vista interna) --------------
+    @_cacheado("reclamos", "usuarios", "mensajes_reclamo")
     def listar_reclamos_con_cliente(
-        self, estado: Optional[str] = None, texto: str = ""
+        self,
+        estado: Optional[str] = None,
+        texto: str = "",
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         q = [
-            "SELECT r.id, r.descripcion, r.estado, r.fecha, u.usuario as cliente",
+            "SELECT r.id, r.descripcion, r.estado, r.fecha, u.usuario as cliente,",
+            "u.usuario as cliente_usuario, u.email as cliente_email",
             "FROM reclamos r JOIN usuarios u ON u.id = r.cliente_id",
             "WHERE 1=1",
         ]
@@ -162,30 +539,63 @@ class GestorDB:
         if estado and estado in ESTADOS:
             q.append("AND r.estado = ?")
             params.append(estado)
-        if texto:
-            q.append("AND (r.descripcion LIKE ? OR u.usuario LIKE ?)")
-            like = f"%{texto}%"
-            params.extend([like, like])
-        q.append("ORDER BY r.id DESC")
+        consulta = consulta_fts(texto)
+        if consulta:
+            q.append(f"AND r.id IN (SELECT reclamo_id FROM ({_SQL_COINCIDENCIAS}))")
+            params.extend([consulta, consulta, f"%{texto.strip()}%"])
+        _paginar(q, params, after_id, limit, col="r.id")
         sql = " ".join(q)
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+        with conexion() as con, closing(con.cursor()) as cur:
             cur.execute(sql, params)
             return [dict(row) for row in cur.fetchall()]
 
+    @_cacheado("reclamos", "usuarios", "mensajes_reclamo")
+    def buscar_reclamos(
+        self, texto: str, estado: Optional[str] = None, limit: int = 50, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Búsqueda de texto completo sobre descripciones y mensajes de chat.
+
+        Cada palabra se busca como prefijo ("llan" encuentra "llanta") y los
+        resultados se ordenan por relevancia (bm25) y luego por id descendente.
+        """
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return []
+        q = [
+            f"WITH hits AS ({_SQL_COINCIDENCIAS})",
+            "SELECT r.id, r.descripcion, r.estado, r.fecha, u.usuario as cliente,",
+            "u.usuario as cliente_usuario, u.email as cliente_email, MIN(h.rango) as rango",
+            "FROM hits h JOIN reclamos r ON r.id = h.reclamo_id",
+            "JOIN usuarios u ON u.id = r.cliente_id",
+            "WHERE 1=1",
+        ]
+        params: List[Any] = [consulta, consulta, f"%{texto.strip()}%"]
+        if estado and estado in ESTADOS:
+            q.append("AND r.estado = ?")
+            params.append(estado)
+        q.append("GROUP BY r.id ORDER BY rango ASC, r.id DESC LIMIT ? OFFSET ?")
+        params.extend([int(limit), int(offset)])
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            return [dict(row) for row in cur.fetchall()]
+
     def actualizar_estado(self, reclamo_id: int, nuevo_estado: str) -> None:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+        def op(cur: sqlite3.Cursor) -> None:
             cur.execute(
                 "UPDATE reclamos SET estado=? WHERE id=?",
                 (nuevo_estado, reclamo_id),
             )
-            con.commit()
+
+        _escribir(op, "reclamos")
 
     # ---------------------- Chat -------------------------
     def crear_mensaje(
         self, reclamo_id: int, usuario_id: int, tipo_usuario: str, mensaje: str
     ) -> None:
         now = datetime.now().strftime(ISO)
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+
+        def op(cur: sqlite3.Cursor) -> None:
             cur.execute(
                 """
                 INSERT INTO mensajes_reclamo (reclamo_id, usuario_id, tipo_usuario, mensaje, fecha_envio)
@@ -193,64 +603,364 @@ class GestorDB:
                 """,
                 (reclamo_id, usuario_id, tipo_usuario, mensaje, now),
             )
-            con.commit()
 
+        _escribir(op, "mensajes_reclamo")
+
+    @_cacheado("mensajes_reclamo", "usuarios")
     def listar_mensajes(self, reclamo_id: int) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+        with conexion() as con, closing(con.cursor()) as cur:
             cur.execute(
                 """
-                SELECT usuario_id, tipo_usuario, mensaje, fecha_envio
-                FROM mensajes_reclamo
-                WHERE reclamo_id=?
-                ORDER BY id ASC
+                SELECT m.usuario_id, u.usuario, m.tipo_usuario, m.mensaje, m.fecha_envio
+                FROM mensajes_reclamo m
+                LEFT JOIN usuarios u ON u.id = m.usuario_id
+                WHERE m.reclamo_id=?
+                ORDER BY m.id ASC
                 """,
                 (reclamo_id,),
             )
             return [dict(row) for row in cur.fetchall()]
 
+    @_cacheado("mensajes_reclamo", "usuarios")
+    def listar_mensajes_bulk(self, reclamo_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Mensajes de chat de varios reclamos en una consulta por lote de ids."""
+        ids = list(dict.fromkeys(int(i) for i in reclamo_ids))
+        res: Dict[int, List[Dict[str, Any]]] = {i: [] for i in ids}
+        with conexion() as con, closing(con.cursor()) as cur:
+            for lote in _lotes(ids):
+                marcas = ",".join("?" * len(lote))
+                cur.execute(
+                    f"""
+                    SELECT m.reclamo_id, m.usuario_id, u.usuario, m.tipo_usuario, m.mensaje, m.fecha_envio
+                    FROM mensajes_reclamo m
+                    LEFT JOIN usuarios u ON u.id = m.usuario_id
+                    WHERE m.reclamo_id IN ({marcas})
+                    ORDER BY m.reclamo_id, m.id ASC
+                    """,
+                    lote,
+                )
+                for row in cur.fetchall():
+                    d = dict(row)
+                    res[d.pop("reclamo_id")].append(d)
+        return res
+
     # --------------------- Pedidos -----------------------
     def crear_pedido(self, cliente_id: int, detalle: str) -> int:
         now = datetime.now().strftime(ISO)
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
+
+        def op(cur: sqlite3.Cursor) -> int:
             cur.execute(
                 "INSERT INTO pedidos (cliente_id, detalle, fecha) VALUES (?,?,?)",
                 (cliente_id, detalle, now),
             )
-            pid = cur.lastrowid
-            con.commit()
-            return int(pid)
+            return int(cur.lastrowid)
 
-    def listar_pedidos_cliente(self, cliente_id: int) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
-            cur.execute(
-                "SELECT id, detalle, fecha, estado FROM pedidos WHERE cliente_id=? ORDER BY id DESC",
-                (cliente_id,),
-            )
+        return _escribir(op, "pedidos")
+
+    @_cacheado("pedidos")
+    def listar_pedidos_cliente(
+        self, cliente_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        q = ["SELECT id, detalle, fecha, estado FROM pedidos WHERE cliente_id=?"]
+        params: List[Any] = [cliente_id]
+        _paginar(q, params, after_id, limit)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
             return [dict(row) for row in cur.fetchall()]
 
-    def listar_pedidos(self) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
-            cur.execute("SELECT id, cliente_id, detalle, fecha, estado FROM pedidos ORDER BY id DESC")
+    @_cacheado("pedidos")
+    def listar_pedidos(
+        self, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        q = ["SELECT id, cliente_id, detalle, fecha, estado FROM pedidos WHERE 1=1"]
+        params: List[Any] = []
+        _paginar(q, params, after_id, limit)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
             return [dict(row) for row in cur.fetchall()]
 
     # -------------------- Despachos ----------------------
-    def listar_despachos(self) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
-            cur.execute(
-                """
-                SELECT id, pedido_id, fecha_salida, fecha_entrega, transportista, estado, on_time
-                FROM despachos
-                ORDER BY id DESC
-                """
-            )
+    @_cacheado("despachos")
+    def listar_despachos(
+        self, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        q = [
+            "SELECT id, pedido_id, fecha_salida, fecha_entrega, transportista, estado, on_time",
+            "FROM despachos WHERE 1=1",
+        ]
+        params: List[Any] = []
+        _paginar(q, params, after_id, limit)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
             return [dict(row) for row in cur.fetchall()]
 
     # -------------------- Reportería ---------------------
-    def listar_reclamos(self) -> List[Dict[str, Any]]:
-        with closing(_connect()) as con, closing(con.cursor()) as cur:
-            cur.execute("SELECT id, cliente_id, descripcion, estado, fecha FROM reclamos ORDER BY id DESC")
+    # Los agregados leen los rollups diarios (migración 6), que los triggers
+    # mantienen al día: su costo depende del número de días, no de filas.
+    @_cacheado("despachos", "pedidos", "reclamos")
+    def kpis_reporte(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        transportista: Optional[str] = None,
+        estado: Optional[str] = None,
+        causa: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        KPIs de reportería calculados en SQLite para un rango de fechas.
+
+        Despachos se filtran por día de entrega (y transportista/estado),
+        pedidos y reclamos por su fecha (reclamos también por causa). Los
+        porcentajes y promedios son None si no hay filas en el rango.
+        """
+        q = [
+            "SELECT COALESCE(SUM(despachos), 0) AS despachos,",
+            "100.0 * SUM(a_tiempo) / SUM(despachos) AS pct_a_tiempo,",
+            "SUM(lead_time_suma) / NULLIF(SUM(lead_time_n), 0) AS lead_time_prom",
+            "FROM rollup_despachos_dia WHERE 1=1",
+        ]
+        params: List[Any] = []
+        _filtro_rollup(q, params, desde, hasta, transportista=transportista, estado=estado)
+        qp = ["SELECT COUNT(*) FROM pedidos WHERE 1=1"]
+        pp: List[Any] = []
+        _rango_fechas(qp, pp, "fecha", desde, hasta)
+        qr = [
+            "SELECT COALESCE(SUM(reclamos), 0) AS reclamos,",
+            "100.0 * SUM(CASE WHEN estado = ? THEN reclamos ELSE 0 END) / SUM(reclamos) AS pct_resueltos",
+            "FROM rollup_reclamos_dia WHERE 1=1",
+        ]
+        pr: List[Any] = [ESTADO_RESUELTO]
+        _filtro_rollup(qr, pr, desde, hasta, causa=causa)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            res = dict(cur.fetchone())
+            cur.execute(" ".join(qp), pp)
+            res["pedidos"] = int(cur.fetchone()[0])
+            cur.execute(" ".join(qr), pr)
+            res.update(dict(cur.fetchone()))
+        return res
+
+    @_cacheado("despachos", "pedidos")
+    def resumen_despachos_transportista(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        transportista: Optional[str] = None,
+        estado: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Despachos, % a tiempo y lead time promedio por transportista."""
+        q = [
+            "SELECT transportista, SUM(despachos) AS despachos,",
+            "100.0 * SUM(a_tiempo) / SUM(despachos) AS pct_a_tiempo,",
+            "SUM(lead_time_suma) / NULLIF(SUM(lead_time_n), 0) AS lead_time_prom",
+            "FROM rollup_despachos_dia WHERE 1=1",
+        ]
+        params: List[Any] = []
+        _filtro_rollup(q, params, desde, hasta, transportista=transportista, estado=estado)
+        q.append("GROUP BY transportista ORDER BY transportista")
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            return [dict(row) for row in cur.fetchall()]
+
+    @_cacheado("despachos")
+    def resumen_despachos_mensual(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        transportista: Optional[str] = None,
+        estado: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Despachos y % a tiempo por mes de entrega ('YYYY-MM') y transportista."""
+        q = [
+            "SELECT substr(dia, 1, 7) AS mes, transportista, SUM(despachos) AS despachos,",
+            "100.0 * SUM(a_tiempo) / SUM(despachos) AS pct_a_tiempo",
+            "FROM rollup_despachos_dia WHERE 1=1",
+        ]
+        params: List[Any] = []
+        _filtro_rollup(q, params, desde, hasta, transportista=transportista, estado=estado)
+        q.append("GROUP BY 1, 2 ORDER BY 1, 2")
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            return [dict(row) for row in cur.fetchall()]
+
+    @_cacheado("despachos")
+    def serie_despachos_diaria(
+        self,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        transportista: Optional[str] = None,
+        estado: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Despachos entregados por día ('YYYY-MM-DD')."""
+        q = ["SELECT dia AS fecha, SUM(despachos) AS despachos FROM rollup_despachos_dia WHERE 1=1"]
+        params: List[Any] = []
+        _filtro_rollup(q, params, desde, hasta, transportista=transportista, estado=estado)
+        q.append("GROUP BY dia ORDER BY dia")
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            return [dict(row) for row in cur.fetchall()]
+
+    @_cacheado("reclamos")
+    def conteo_reclamos_causa(
+        self, desde: Optional[str] = None, hasta: Optional[str] = None, causa: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Reclamos por causa, de mayor a menor (base del Pareto)."""
+        q = ["SELECT causa, SUM(reclamos) AS conteo FROM rollup_reclamos_dia WHERE 1=1"]
+        params: List[Any] = []
+        _filtro_rollup(q, params, desde, hasta, causa=causa)
+        q.append("GROUP BY causa ORDER BY conteo DESC, causa")
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            return [dict(row) for row in cur.fetchall()]
+
+    def reconstruir_rollups(self) -> None:
+        """
+        Recalcula los rollups diarios desde las tablas base (una transacción).
+
+        Incrementa versiones_tabla de las tablas base para que otros procesos
+        (la app de Streamlit, si esto corre desde utils/) descarten sus
+        consultas cacheadas sobre los rollups.
+        """
+        with conexion() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for sql in SQL_RECONSTRUIR_ROLLUPS:
+                    con.execute(sql)
+                con.execute(
+                    "UPDATE versiones_tabla SET version = version + 1"
+                    " WHERE tabla IN ('despachos', 'pedidos', 'reclamos')"
+                )
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+        _cache.invalidar("despachos", "pedidos", "reclamos")
+
+    def cambios_reporte(self, desde_seq: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Filas de reclamos, pedidos y despachos para la reportería.
+
+        Con ``desde_seq=None`` devuelve las tablas completas; con un número,
+        solo las filas creadas o modificadas y los ids borrados después de esa
+        marca (cambios_filas, migración 7). Todo se lee en una misma
+        transacción, así la marca devuelta es coherente con las filas.
+
+        Returns:
+            {"seq": int, "completo": bool,
+             "tablas": {tabla: {"columnas": [...], "filas": [...], "borrados": [...]}}}
+        """
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute("BEGIN")
+            try:
+                seq = cur.execute("SELECT COALESCE(MAX(seq), 0) FROM cambios_filas").fetchone()[0]
+                tablas: Dict[str, Any] = {}
+                if desde_seq is not None and seq == desde_seq:
+                    return {"seq": seq, "completo": False, "tablas": tablas}
+                for tabla, sql in _SQL_REPORTE.items():
+                    borrados: List[int] = []
+                    if desde_seq is None:
+                        cur.execute(f"{sql} ORDER BY t.id")
+                    else:
+                        cur.execute(
+                            f"{sql} WHERE t.id IN (SELECT fila_id FROM cambios_filas"
+                            " WHERE tabla = ? AND seq > ? AND borrado = 0) ORDER BY t.id",
+                            (tabla, desde_seq),
+                        )
+                    columnas = [c[0] for c in cur.description]
+                    filas = [tuple(row) for row in cur.fetchall()]
+                    if desde_seq is not None:
+                        cur.execute(
+                            "SELECT fila_id FROM cambios_filas WHERE tabla = ? AND seq > ? AND borrado = 1",
+                            (tabla, desde_seq),
+                        )
+                        borrados = [row[0] for row in cur.fetchall()]
+                    tablas[tabla] = {"columnas": columnas, "filas": filas, "borrados": borrados}
+                return {"seq": seq, "completo": desde_seq is None, "tablas": tablas}
+            finally:
+                con.commit()
+
+    def iterar_reporte(
+        self,
+        tabla: str,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        tam_lote: int = 5_000,
+        **iguales: Optional[str],
+    ) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        """
+        Recorre una tabla de reportería (columnas de cambios_reporte) en lotes.
+
+        Lee con ``fetchmany`` de un único SELECT, así la memoria depende de
+        ``tam_lote`` y no del tamaño de la tabla; el SELECT ve una foto
+        coherente de la base aunque haya escrituras mientras se itera. Usa una
+        conexión dedicada (no la del pool), abierta hasta agotar o cerrar el
+        generador: quien consume los lotes puede usar GestorDB entretanto o
+        pasar el generador a otro hilo. Si no hay filas se entrega un único
+        lote vacío, para conocer las columnas.
+
+        Args:
+            tabla: "reclamos", "pedidos" o "despachos"
+            desde, hasta: fechas ISO 'YYYY-MM-DD' (inclusive) sobre la fecha de la tabla
+            iguales: transportista/estado (despachos) o causa (reclamos); None = sin filtro
+
+        Yields:
+            (columnas, filas) con a lo sumo ``tam_lote`` tuplas por lote
+        """
+        q, params = _sql_reporte_filtrado(tabla, desde, hasta, iguales)
+        q.append("ORDER BY t.id")
+        with conexion_dedicada() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
+            columnas = [c[0] for c in cur.description]
+            hubo_filas = False
+            while True:
+                filas = cur.fetchmany(tam_lote)
+                if not filas:
+                    break
+                hubo_filas = True
+                yield columnas, [tuple(row) for row in filas]
+            if not hubo_filas:
+                yield columnas, []
+
+    def tipos_reporte(self, tabla: str) -> List[Tuple[str, str]]:
+        """
+        (columna, tipo declarado en el esquema) de cada columna de
+        ``iterar_reporte``, en el mismo orden; '' si la columna no declara tipo.
+        """
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(f"{_SQL_REPORTE[tabla]} LIMIT 0")
+            columnas = [c[0] for c in cur.description]
+            declarados: Dict[str, Dict[str, str]] = {}
+            tipos: List[Tuple[str, str]] = []
+            for col in columnas:
+                origen, nombre = _ORIGEN_REPORTE.get(col, (tabla, col))
+                if origen not in declarados:
+                    cur.execute(f"PRAGMA table_info({origen})")
+                    declarados[origen] = {row[1]: row[2] or "" for row in cur.fetchall()}
+                tipos.append((col, declarados[origen].get(nombre, "")))
+            return tipos
+
+    def contar_reporte(
+        self, tabla: str, desde: Optional[str] = None, hasta: Optional[str] = None, **iguales: Optional[str]
+    ) -> int:
+        """Filas que recorrería ``iterar_reporte`` con los mismos filtros."""
+        q, params = _sql_reporte_filtrado(tabla, desde, hasta, iguales)
+        with conexion() as con:
+            return con.execute(f"SELECT COUNT(*) FROM ({' '.join(q)})", params).fetchone()[0]
+
+    @_cacheado("reclamos")
+    def listar_reclamos(
+        self, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        q = ["SELECT id, cliente_id, descripcion, estado, fecha, causa FROM reclamos WHERE 1=1"]
+        params: List[Any] = []
+        _paginar(q, params, after_id, limit)
+        with conexion() as con, closing(con.cursor()) as cur:
+            cur.execute(" ".join(q), params)
             return [dict(row) for row in cur.fetchall()]
 
 
 # Inicializar el esquema al importar el módulo (primera carga)
 _ensure_schema()
+
+if DB_ESCRITOR_AGRUPADO:
+    activar_escritor_agrupado()
@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+"""
+Migraciones versionadas del esquema SQLite.
+
+La versión aplicada se guarda en ``PRAGMA user_version`` y cada migración deja
+además un registro en la tabla ``migraciones``. Las migraciones se aplican en
+orden, cada una en su propia transacción, por lo que una base existente solo
+recibe las que le faltan (sin reconstruirla).
+"""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from typing import List, NamedTuple, Tuple
+
+ISO = "%Y-%m-%dT%H:%M:%S"
+
+
+# Tablas cuyas escrituras incrementan versiones_tabla (ver migración 4)
+TABLAS_VERSIONADAS = (
+    "usuarios",
+    "reclamos",
+    "imagenes_reclamo",
+    "mensajes_reclamo",
+    "pedidos",
+    "despachos",
+)
+
+# Tablas que carga la reportería (cambios_filas, migración 7)
+TABLAS_REPORTE = ("reclamos", "pedidos", "despachos")
+
+# Claves de agrupación de los rollups (los NULL se agrupan con una etiqueta)
+_DIA_DESPACHO = "substr({fila}.fecha_entrega, 1, 10)"
+_TRANSPORTISTA = "COALESCE({fila}.transportista, 'Sin transportista')"
+_ESTADO = "COALESCE({fila}.estado, 'Sin estado')"
+_CAUSA = "COALESCE(NULLIF(TRIM({fila}.causa), ''), 'Sin causa')"
+
+# Suma (signo=+) o resta (signo=-) una fila de despachos a rollup_despachos_dia
+_ROLLUP_DESPACHO = (
+    """
+    INSERT INTO rollup_despachos_dia
+        (dia, transportista, estado, despachos, a_tiempo, lead_time_suma, lead_time_n)
+    SELECT d.dia, d.transportista, d.estado, {signo}1, {signo}d.a_tiempo,
+           {signo}COALESCE(d.lead, 0), {signo}(d.lead IS NOT NULL)
+    FROM (
+        SELECT """
+    + _DIA_DESPACHO
+    + """ AS dia, """
+    + _TRANSPORTISTA
+    + """ AS transportista, """
+    + _ESTADO
+    + """ AS estado,
+            COALESCE({fila}.on_time, 0) AS a_tiempo,
+            (SELECT julianday({fila}.fecha_entrega) - julianday(p.fecha)
+             FROM pedidos p WHERE p.id = {fila}.pedido_id) AS lead
+    ) d
+    WHERE d.dia IS NOT NULL
+    ON CONFLICT (dia, transportista, estado) DO UPDATE SET
+        despachos = despachos + excluded.despachos,
+        a_tiempo = a_tiempo + excluded.a_tiempo,
+        lead_time_suma = lead_time_suma + excluded.lead_time_suma,
+        lead_time_n = lead_time_n + excluded.lead_time_n;
+    """
+)
+
+# Tras restar una fila: borra su celda del rollup si quedó en cero (solo esa
+# clave; un DELETE sin clave recorrería todo el rollup en cada escritura)
+_LIMPIAR_DESPACHO = (
+    """
+    DELETE FROM rollup_despachos_dia
+    WHERE dia = """
+    + _DIA_DESPACHO
+    + """ AND transportista = """
+    + _TRANSPORTISTA
+    + """ AND estado = """
+    + _ESTADO
+    + """ AND despachos <= 0;
+    """
+)
+
+# Suma o resta una fila de reclamos a rollup_reclamos_dia
+_ROLLUP_RECLAMO = (
+    """
+    INSERT INTO rollup_reclamos_dia (dia, causa, estado, reclamos)
+    SELECT substr({fila}.fecha, 1, 10), """
+    + _CAUSA
+    + """, {fila}.estado, {signo}1
+    WHERE {fila}.fecha IS NOT NULL
+    ON CONFLICT (dia, causa, estado) DO UPDATE SET reclamos = reclamos + excluded.reclamos;
+    """
+)
+
+_LIMPIAR_RECLAMO = (
+    """
+    DELETE FROM rollup_reclamos_dia
+    WHERE dia = substr({fila}.fecha, 1, 10) AND causa = """
+    + _CAUSA
+    + """ AND estado = {fila}.estado AND reclamos <= 0;
+    """
+)
+
+# Cambio de pedidos.fecha: corrige el lead time de sus despachos en el rollup
+# (resta el aporte con OLD.fecha y suma el de NEW.fecha, por celda)
+_LEAD_PEDIDO = "julianday(d.fecha_entrega) - julianday({fila}.fecha)"
+_CLAVE_DESPACHO_D = (
+    _DIA_DESPACHO.format(fila="d")
+    + ", "
+    + _TRANSPORTISTA.format(fila="d")
+    + ", "
+    + _ESTADO.format(fila="d")
+)
+_ROLLUP_PEDIDO_FECHA = (
+    """
+    UPDATE rollup_despachos_dia SET
+        lead_time_suma = lead_time_suma + (
+            SELECT COALESCE(SUM("""
+    + _LEAD_PEDIDO.format(fila="NEW")
+    + """), 0) - COALESCE(SUM("""
+    + _LEAD_PEDIDO.format(fila="OLD")
+    + """), 0)
+            FROM despachos d
+            WHERE d.pedido_id = NEW.id
+              AND ("""
+    + _CLAVE_DESPACHO_D
+    + """) = (rollup_despachos_dia.dia, rollup_despachos_dia.transportista, rollup_despachos_dia.estado)
+        ),
+        lead_time_n = lead_time_n + (
+            SELECT COUNT("""
+    + _LEAD_PEDIDO.format(fila="NEW")
+    + """) - COUNT("""
+    + _LEAD_PEDIDO.format(fila="OLD")
+    + """)
+            FROM despachos d
+            WHERE d.pedido_id = NEW.id
+              AND ("""
+    + _CLAVE_DESPACHO_D
+    + """) = (rollup_despachos_dia.dia, rollup_despachos_dia.transportista, rollup_despachos_dia.estado)
+        )
+    WHERE (dia, transportista, estado) IN (
+        SELECT """
+    + _CLAVE_DESPACHO_D
+    + """
+        FROM despachos d WHERE d.pedido_id = NEW.id AND d.fecha_entrega IS NOT NULL
+    );
+    """
+)
+
+
+def _triggers_rollup() -> Tuple[str, ...]:
+    """CREATE TRIGGER que mantienen los rollups (migraciones 6 y 8)."""
+    restar_despacho = _ROLLUP_DESPACHO.format(fila="OLD", signo="-") + _LIMPIAR_DESPACHO.format(fila="OLD")
+    restar_reclamo = _ROLLUP_RECLAMO.format(fila="OLD", signo="-") + _LIMPIAR_RECLAMO.format(fila="OLD")
+    return tuple(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_{tabla}_{nombre} AFTER {evento} ON {tabla} BEGIN
+            {cuerpo}
+        END
+        """
+        for tabla, nombre, evento, cuerpo in (
+            ("despachos", "ai", "INSERT", _ROLLUP_DESPACHO.format(fila="NEW", signo="+")),
+            ("despachos", "ad", "DELETE", restar_despacho),
+            ("despachos", "au", "UPDATE", restar_despacho + _ROLLUP_DESPACHO.format(fila="NEW", signo="+")),
+            ("reclamos", "ai", "INSERT", _ROLLUP_RECLAMO.format(fila="NEW", signo="+")),
+            ("reclamos", "ad", "DELETE", restar_reclamo),
+            (
+                "reclamos",
+                "au",
+                "UPDATE OF fecha, causa, estado",
+                restar_reclamo + _ROLLUP_RECLAMO.format(fila="NEW", signo="+"),
+            ),
+        )
+    )
+
+
+# Nombres de los triggers de rollup creados en la migración 6
+_TRIGGERS_ROLLUP_V6 = tuple(
+    f"rollup_{tabla}_{nombre}" for tabla in ("despachos", "reclamos") for nombre in ("ai", "ad", "au")
+)
+
+# Recalcula los rollups desde las tablas base (migración 6 y utils/reconstruir_rollups.py)
+SQL_RECONSTRUIR_ROLLUPS: Tuple[str, ...] = (
+    "DELETE FROM rollup_despachos_dia",
+    """
+    INSERT INTO rollup_despachos_dia
+        (dia, transportista, estado, despachos, a_tiempo, lead_time_suma, lead_time_n)
+    SELECT """
+    + _DIA_DESPACHO.format(fila="d")
+    + ", "
+    + _TRANSPORTISTA.format(fila="d")
+    + ", "
+    + _ESTADO.format(fila="d")
+    + """,
+           COUNT(*), SUM(COALESCE(d.on_time, 0)),
+           COALESCE(SUM(julianday(d.fecha_entrega) - julianday(p.fecha)), 0),
+           COUNT(julianday(d.fecha_entrega) - julianday(p.fecha))
+    FROM despachos d LEFT JOIN pedidos p ON p.id = d.pedido_id
+    WHERE d.fecha_entrega IS NOT NULL
+    GROUP BY 1, 2, 3
+    """,
+    "DELETE FROM rollup_reclamos_dia",
+    """
+    INSERT INTO rollup_reclamos_dia (dia, causa, estado, reclamos)
+    SELECT substr(r.fecha, 1, 10), """
+    + _CAUSA.format(fila="r")
+    + """, r.estado, COUNT(*)
+    FROM reclamos r
+    WHERE r.fecha IS NOT NULL
+    GROUP BY 1, 2, 3
+    """,
+)
+
+
+class Migracion(NamedTuple):
+    version: int
+    nombre: str
+    sentencias: Tuple[str, ...]
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(
+        1,
+        "esquema inicial",
+        (
+            # usuarios (referencia básica)
+            """
+            CREATE TABLE IF NOT EXISTS usuarios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                usuario TEXT UNIQUE NOT NULL,
+                email TEXT,
+                password_hash TEXT,
+                rol TEXT NOT NULL
+            )
+            """,
+            # reclamos del cliente
+            """
+            CREATE TABLE IF NOT EXISTS reclamos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id INTEGER NOT NULL,
+                descripcion TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                FOREIGN KEY (cliente_id) REFERENCES usuarios(id)
+            )
+            """,
+            # imágenes asociadas a reclamos
+            """
+            CREATE TABLE IF NOT EXISTS imagenes_reclamo (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                reclamo_id INTEGER NOT NULL,
+                ruta TEXT NOT NULL,
+                FOREIGN KEY (reclamo_id) REFERENCES reclamos(id)
+            )
+            """,
+            # mensajes de chat por reclamo
+            """
+            CREATE TABLE IF NOT EXISTS mensajes_reclamo (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                reclamo_id INTEGER NOT NULL,
+                usuario_id INTEGER NOT NULL,
+                tipo_usuario TEXT NOT NULL,  -- 'cliente' | 'interno'
+                mensaje TEXT NOT NULL,
+                fecha_envio TEXT NOT NULL,
+                FOREIGN KEY (reclamo_id) REFERENCES reclamos(id),
+                FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+            )
+            """,
+            # pedidos del cliente (simple)
+            """
+            CREATE TABLE IF NOT EXISTS pedidos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id INTEGER NOT NULL,
+                detalle TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                estado TEXT DEFAULT 'Nuevo',
+                FOREIGN KEY (cliente_id) REFERENCES usuarios(id)
+            )
+            """,
+            # despachos asociados a pedidos (simple)
+            """
+            CREATE TABLE IF NOT EXISTS despachos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pedido_id INTEGER NOT NULL,
+                fecha_salida TEXT,
+                fecha_entrega TEXT,
+                transportista TEXT,
+                estado TEXT,
+                on_time INTEGER DEFAULT 1,
+                FOREIGN KEY (pedido_id) REFERENCES pedidos(id)
+            )
+            """,
+        ),
+    ),
+    Migracion(
+        2,
+        "indices de consulta",
+        (
+            # listar_reclamos_cliente: WHERE cliente_id=? ORDER BY id DESC
+            "CREATE INDEX IF NOT EXISTS idx_reclamos_cliente ON reclamos(cliente_id, id)",
+            # listar_reclamos_con_cliente(estado=...): WHERE estado=? ORDER BY id DESC
+            "CREATE INDEX IF NOT EXISTS idx_reclamos_estado ON reclamos(estado, id)",
+            # listar_imagenes: SELECT ruta WHERE reclamo_id=? ORDER BY id (cubriente)
+            "CREATE INDEX IF NOT EXISTS idx_imagenes_reclamo ON imagenes_reclamo(reclamo_id, id, ruta)",
+            # listar_mensajes: WHERE reclamo_id=? ORDER BY id
+            "CREATE INDEX IF NOT EXISTS idx_mensajes_reclamo ON mensajes_reclamo(reclamo_id, id)",
+            # listar_pedidos_cliente: WHERE cliente_id=? ORDER BY id DESC
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_cliente ON pedidos(cliente_id, id)",
+            # despachos por pedido (joins de reportería)
+            "CREATE INDEX IF NOT EXISTS idx_despachos_pedido ON despachos(pedido_id, id)",
+        ),
+    ),
+    Migracion(
+        3,
+        "busqueda de texto completo (FTS5)",
+        (
+            # Índices FTS de contenido externo: el texto vive en reclamos/mensajes_reclamo
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS reclamos_fts USING fts5(
+                descripcion, content='reclamos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            """,
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS mensajes_fts USING fts5(
+                mensaje, content='mensajes_reclamo', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS reclamos_fts_ai AFTER INSERT ON reclamos BEGIN
+                INSERT INTO reclamos_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS reclamos_fts_ad AFTER DELETE ON reclamos BEGIN
+                INSERT INTO reclamos_fts(reclamos_fts, rowid, descripcion)
+                VALUES ('delete', old.id, old.descripcion);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS reclamos_fts_au AFTER UPDATE OF descripcion ON reclamos BEGIN
+                INSERT INTO reclamos_fts(reclamos_fts, rowid, descripcion)
+                VALUES ('delete', old.id, old.descripcion);
+                INSERT INTO reclamos_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS mensajes_fts_ai AFTER INSERT ON mensajes_reclamo BEGIN
+                INSERT INTO mensajes_fts(rowid, mensaje) VALUES (new.id, new.mensaje);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS mensajes_fts_ad AFTER DELETE ON mensajes_reclamo BEGIN
+                INSERT INTO mensajes_fts(mensajes_fts, rowid, mensaje)
+                VALUES ('delete', old.id, old.mensaje);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS mensajes_fts_au AFTER UPDATE OF mensaje ON mensajes_reclamo BEGIN
+                INSERT INTO mensajes_fts(mensajes_fts, rowid, mensaje)
+                VALUES ('delete', old.id, old.mensaje);
+                INSERT INTO mensajes_fts(rowid, mensaje) VALUES (new.id, new.mensaje);
+            END
+            """,
+            # Indexar las filas que ya existían
+            "INSERT INTO reclamos_fts(reclamos_fts) VALUES ('rebuild')",
+            "INSERT INTO mensajes_fts(mensajes_fts) VALUES ('rebuild')",
+        ),
+    ),
+    Migracion(
+        4,
+        "versiones por tabla (coherencia de cache entre procesos)",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS versiones_tabla (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """,
+        )
+        + tuple(
+            sql
+            for tabla in TABLAS_VERSIONADAS
+            for sql in (
+                f"INSERT OR IGNORE INTO versiones_tabla (tabla, version) VALUES ('{tabla}', 0)",
+                *(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS ver_{tabla}_{op[0].lower()} AFTER {op} ON {tabla} BEGIN
+                        UPDATE versiones_tabla SET version = version + 1 WHERE tabla = '{tabla}';
+                    END
+                    """
+                    for op in ("INSERT", "UPDATE", "DELETE")
+                ),
+            )
+        ),
+    ),
+    Migracion(
+        5,
+        "indices por fecha para agregados de reportería",
+        (
+            "CREATE INDEX IF NOT EXISTS idx_despachos_entrega ON despachos(fecha_entrega)",
+            "CREATE INDEX IF NOT EXISTS idx_pedidos_fecha ON pedidos(fecha)",
+            "CREATE INDEX IF NOT EXISTS idx_reclamos_fecha ON reclamos(fecha, estado)",
+        ),
+    ),
+    Migracion(
+        6,
+        "rollups diarios de reportería",
+        (
+            "ALTER TABLE reclamos ADD COLUMN causa TEXT",
+            # día (fecha_entrega) × transportista × estado
+            """
+            CREATE TABLE IF NOT EXISTS rollup_despachos_dia (
+                dia TEXT NOT NULL,
+                transportista TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                despachos INTEGER NOT NULL DEFAULT 0,
+                a_tiempo INTEGER NOT NULL DEFAULT 0,
+                lead_time_suma REAL NOT NULL DEFAULT 0,
+                lead_time_n INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, transportista, estado)
+            ) WITHOUT ROWID
+            """,
+            # día (fecha) × causa × estado
+            """
+            CREATE TABLE IF NOT EXISTS rollup_reclamos_dia (
+                dia TEXT NOT NULL,
+                causa TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                reclamos INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, causa, estado)
+            ) WITHOUT ROWID
+            """,
+        )
+        + _triggers_rollup()
+        + SQL_RECONSTRUIR_ROLLUPS,
+    ),
+    Migracion(
+        7,
+        "registro de filas cambiadas (carga incremental de reportería)",
+        (
+            # Última modificación de cada fila; seq es global y creciente
+            """
+            CREATE TABLE IF NOT EXISTS cambios_filas (
+                tabla TEXT NOT NULL,
+                fila_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                borrado INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tabla, fila_id)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_cambios_filas_seq ON cambios_filas(seq)",
+            "CREATE INDEX IF NOT EXISTS idx_cambios_filas_tabla_seq ON cambios_filas(tabla, seq)",
+        )
+        + tuple(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS cambios_{tabla}_{op[0].lower()} AFTER {op} ON {tabla} BEGIN
+                INSERT INTO cambios_filas (tabla, fila_id, seq, borrado)
+                VALUES ('{tabla}', {fila}.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM cambios_filas), {borrado})
+                ON CONFLICT (tabla, fila_id) DO UPDATE SET seq = excluded.seq, borrado = excluded.borrado;
+            END
+            """
+            for tabla in TABLAS_REPORTE
+            for op, fila, borrado in (("INSERT", "NEW", 0), ("UPDATE", "NEW", 0), ("DELETE", "OLD", 1))
+        ),
+    ),
+    Migracion(
+        8,
+        "triggers de rollup sin recorrer el rollup y con cambios de pedidos.fecha",
+        tuple(f"DROP TRIGGER IF EXISTS {nombre}" for nombre in _TRIGGERS_ROLLUP_V6)
+        + _triggers_rollup()
+        + (
+            f"""
+            CREATE TRIGGER IF NOT EXISTS rollup_pedidos_fecha AFTER UPDATE OF fecha ON pedidos
+            WHEN OLD.fecha IS NOT NEW.fecha BEGIN
+                {_ROLLUP_PEDIDO_FECHA}
+            END
+            """,
+        )
+        # Los lead times de pedidos editados antes de esta migración pueden estar desviados
+        + SQL_RECONSTRUIR_ROLLUPS,
+    ),
+    Migracion(
+        9,
+        "cambios de pedidos.fecha marcan sus despachos (fecha_pedido en reportería)",
+        (
+            """
+            CREATE TRIGGER IF NOT EXISTS cambios_pedidos_fecha AFTER UPDATE OF fecha ON pedidos
+            WHEN OLD.fecha IS NOT NEW.fecha BEGIN
+                INSERT INTO cambios_filas (tabla, fila_id, seq, borrado)
+                SELECT 'despachos', d.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM cambios_filas), 0
+                FROM despachos d WHERE d.pedido_id = NEW.id
+                ON CONFLICT (tabla, fila_id) DO UPDATE SET seq = excluded.seq, borrado = 0;
+            END
+            """,
+        ),
+    ),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1].version
+
+
+def version_esquema(con: sqlite3.Connection) -> int:
+    return int(con.execute("PRAGMA user_version").fetchone()[0])
+
+
+def aplicar_migraciones(con: sqlite3.Connection) -> int:
+    """Aplica en orden las migraciones pendientes y devuelve la versión final."""
+    if version_esquema(con) >= VERSION_ACTUAL:
+        return version_esquema(con)
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migraciones (
+            version INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            aplicada TEXT NOT NULL
+        )
+        """
+    )
+    for m in MIGRACIONES:
+        # BEGIN IMMEDIATE serializa a varios procesos migrando a la vez
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            if version_esquema(con) >= m.version:
+                con.rollback()
+                continue
+            for sql in m.sentencias:
+                con.execute(sql)
+            con.execute(
+                "INSERT INTO migraciones (version, nombre, aplicada) VALUES (?,?,?)",
+                (m.version, m.nombre, datetime.now().strftime(ISO)),
+            )
+            con.execute(f"PRAGMA user_version={int(m.version)}")
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+    return version_esquema(con)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Reportes de reportería generados sin Streamlit (ver utils/generar_reportes.py).
+
+Cada corrida escribe en ``<directorio>/<AAAA-MM-DD>/`` el PDF de KPIs con
+recomendaciones, el libro Excel con las hojas filtradas y las mismas hojas
+particionadas por mes en ``particiones/<tabla>/<AAAA-MM>.csv``. Un
+manifiesto guarda la huella (hash del contenido) de cada partición: las que
+no cambiaron desde la corrida anterior se enlazan (o copian) desde ella en
+vez de volver a escribirse, así una corrida nocturna solo serializa los
+meses que recibieron cambios.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config.configuracion import REPORTES_CONSERVAR_DIAS
+from core.exportes import escribir_excel, escribir_pdf
+from core.filtros_reporte import COLUMNA_FECHA
+
+MANIFIESTO = "manifiesto.json"
+SIN_FECHA = "sin-fecha"
+
+
+def particiones(tabla: str, df: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """(mes "AAAA-MM" o SIN_FECHA, filas) según la columna de fecha de la tabla."""
+    col = COLUMNA_FECHA.get(tabla)
+    if df.empty:
+        return
+    if col not in df.columns:
+        yield SIN_FECHA, df
+        return
+    meses = df[col].to_numpy("datetime64[ns]").astype("datetime64[M]")
+    for mes, filas in df.groupby(meses, sort=True, dropna=False):
+        yield (SIN_FECHA if pd.isna(mes) else pd.Timestamp(mes).strftime("%Y-%m")), filas
+
+
+def huella(df: pd.DataFrame) -> str:
+    """
+    Hash del contenido: nombres de columna y valores. No depende del índice,
+    de los códigos de categoría ni del ancho de los enteros (compactar).
+    """
+    h = hashlib.sha256(repr([str(c) for c in df.columns]).encode())
+    h.update(np.ascontiguousarray(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def _leer_manifiesto(directorio: Path) -> Dict[str, Dict[str, str]]:
+    try:
+        return json.loads((directorio / MANIFIESTO).read_text(encoding="utf-8"))["particiones"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _escribir_atomico(destino: Path, escribir) -> None:
+    parcial = destino.with_name(destino.name + ".parcial")
+    try:
+        escribir(str(parcial))
+        os.replace(parcial, destino)
+    finally:
+        if parcial.exists():
+            parcial.unlink()
+
+
+def _reutilizar(origen: Path, destino: Path) -> None:
+    """Enlace duro al archivo de la corrida anterior (copia si el sistema no lo permite)."""
+    if destino.exists():
+        destino.unlink()
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+def generar_reportes(
+    directorio: Union[str, Path],
+    tablas: Dict[str, pd.DataFrame],
+    kpi_dict: Dict[str, Any],
+    notas: Optional[List[str]] = None,
+    fecha: Optional[date] = None,
+    excel: bool = True,
+    conservar_dias: int = REPORTES_CONSERVAR_DIAS,
+) -> Dict[str, Any]:
+    """
+    Escribe la corrida del día ``fecha`` (hoy por defecto).
+
+    Args:
+        tablas: {tabla: DataFrame ya filtrado} (reclamos, pedidos, despachos)
+        kpi_dict: KPIs formateados (tablero_reporte.kpis_texto)
+        notas: recomendaciones / observaciones para el PDF
+        excel: escribir también el libro Excel (siempre completo)
+        conservar_dias: las corridas más antiguas se borran (0 = no borrar)
+
+    Returns:
+        {"carpeta", "escritas", "reutilizadas", "archivos"}; escritas y
+        reutilizadas cuentan particiones.
+    """
+    directorio = Path(directorio)
+    fecha = fecha or date.today()
+    carpeta = directorio / fecha.isoformat()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    previas = _leer_manifiesto(directorio)
+    actuales: Dict[str, Dict[str, str]] = {}
+    archivos: List[Path] = []
+    escritas = reutilizadas = 0
+
+    for tabla, df in tablas.items():
+        (carpeta / "particiones" / tabla).mkdir(parents=True, exist_ok=True)
+        for mes, filas in particiones(tabla, df):
+            nombre = f"{tabla}/{mes}"
+            destino = carpeta / "particiones" / tabla / f"{mes}.csv"
+            h = huella(filas)
+            previa = previas.get(nombre)
+            origen = directorio / previa["ruta"] if previa else None
+            if previa and previa["huella"] == h and origen.exists():
+                if origen.resolve() != destino.resolve():
+                    _reutilizar(origen, destino)
+                reutilizadas += 1
+            else:
+                _escribir_atomico(destino, lambda ruta, filas=filas: filas.to_csv(ruta, index=False))
+                escritas += 1
+            actuales[nombre] = {"huella": h, "ruta": destino.relative_to(directorio).as_posix()}
+            archivos.append(destino)
+    # Particiones de una corrida anterior del mismo día que ya no corresponden (p.ej. otros filtros)
+    vigentes = set(archivos)
+    for sobrante in (carpeta / "particiones").glob("*/*.csv"):
+        if sobrante not in vigentes:
+            sobrante.unlink()
+
+    pdf = carpeta / "resumen_kpi.pdf"
+    _escribir_atomico(pdf, lambda ruta: escribir_pdf(ruta, kpi_dict, notas))
+    archivos.append(pdf)
+    if excel:
+        libro = carpeta / "reportes.xlsx"
+        hojas = {t.capitalize(): df for t, df in tablas.items()}
+        hojas["KPIs"] = pd.DataFrame([kpi_dict])
+        _escribir_atomico(libro, lambda ruta: escribir_excel(ruta, hojas))
+        archivos.append(libro)
+
+    manifiesto = {"fecha": fecha.isoformat(), "particiones": actuales}
+    _escribir_atomico(
+        directorio / MANIFIESTO,
+        lambda ruta: Path(ruta).write_text(json.dumps(manifiesto, indent=1), encoding="utf-8"),
+    )
+    if conservar_dias > 0:
+        _borrar_antiguas(directorio, fecha - timedelta(days=conservar_dias))
+    return {"carpeta": carpeta, "escritas": escritas, "reutilizadas": reutilizadas, "archivos": archivos}
+
+
+def _borrar_antiguas(directorio: Path, limite: date) -> None:
+    """Borra las carpetas de corridas (AAAA-MM-DD) anteriores a ``limite``."""
+    for carpeta in directorio.iterdir():
+        try:
+            dia = date.fromisoformat(carpeta.name)
+        except ValueError:
+            continue
+        if carpeta.is_dir() and dia < limite:
+            shutil.rmtree(carpeta, ignore_errors=True)
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Datos del tablero de reportería (KPIs, gráficos y tablas) en una sola pasada.
+
+``calcular_tablero`` recibe los DataFrames ya filtrados y calcula todo lo que
+la página dibuja. Cada dimensión se agrupa una sola vez: los despachos por
+(mes, transportista), de donde salen el SLA por transportista, el mapa de
+calor y el % de entregas a tiempo; los reclamos por causa y por estado. Las
+piezas independientes corren en un ThreadPoolExecutor compartido (pandas y
+NumPy liberan el GIL en agrupaciones, ordenamientos y reducciones).
+
+Con la base real, ``resumen_db`` entrega KPIs y desgloses desde los rollups
+SQL en la misma forma. ``recomendaciones`` y ``kpis_texto`` preparan el
+texto que muestran la página y los reportes programados.
+
+``vista_filtrada`` guarda filtrado y tablero en un LRU acotado por memoria,
+con la clave normalizada del filtro y la versión de los datos
+(MotorFiltros.clave): volver a una vista ya vista no recalcula nada.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from config.configuracion import REPORTE_CACHE_VISTAS_MAX, REPORTE_CACHE_VISTAS_MB, REPORTE_HILOS
+from core.agregados_reporte import histograma, reducir_serie, serie_diaria
+from core.cache import CacheMemoria
+from core.filtros_reporte import MotorFiltros
+
+# Lo que puede pedirse a calcular_tablero
+PARTES = ("kpis", "sla", "calor", "serie", "hist", "pareto", "tablas")
+
+# Columnas que se muestran primero y columna por la que se ordena (descendente)
+ORDEN_TABLAS: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "reclamos": (("id", "fecha", "cliente", "causa", "estado", "detalle"), "fecha"),
+    "pedidos": (("id", "fecha", "cliente", "estado", "monto"), "fecha"),
+    "despachos": (
+        (
+            "id", "fecha_pedido", "fecha_programada", "fecha_entrega",
+            "transportista", "estado", "lead_time_dias", "entrega_a_tiempo",
+        ),
+        "fecha_entrega",
+    ),
+}
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=REPORTE_HILOS, thread_name_prefix="tablero-reporte")
+        return _pool
+
+
+def despachos_mes_transportista(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Único group-by de despachos: columnas mes (datetime64, NaT si no hay
+    fecha), transportista, despachos, a_tiempo (suma) y con_dato (no nulos).
+    Conserva los grupos con claves nulas para que los totales cuadren.
+    """
+    if df.empty or not {"transportista", "fecha_entrega", "entrega_a_tiempo"}.issubset(df.columns):
+        return pd.DataFrame(columns=["mes", "transportista", "despachos", "a_tiempo", "con_dato"])
+    mes = df["fecha_entrega"].to_numpy("datetime64[ns]").astype("datetime64[M]")
+    return (
+        df[["transportista", "entrega_a_tiempo"]]
+        .assign(mes=mes)
+        .groupby(["mes", "transportista"], observed=True, dropna=False)["entrega_a_tiempo"]
+        .agg(["size", "sum", "count"])
+        .set_axis(["despachos", "a_tiempo", "con_dato"], axis=1)
+        .reset_index()
+    )
+
+
+def sla_transportista(grupos: pd.DataFrame) -> pd.DataFrame:
+    """% a tiempo por transportista a partir de despachos_mes_transportista."""
+    grupos = grupos[grupos["transportista"].notna()]
+    if grupos.empty:
+        return pd.DataFrame(columns=["transportista", "despachos", "sla"])
+    agg = grupos.groupby("transportista", as_index=False, observed=True)[["despachos", "a_tiempo", "con_dato"]].sum()
+    agg["entrega_a_tiempo"] = agg["a_tiempo"] / agg["con_dato"]
+    agg = agg[["transportista", "despachos", "entrega_a_tiempo"]]
+    return agg.assign(sla=(agg["entrega_a_tiempo"] * 100).round(1))
+
+
+def calor_mes_transportista(grupos: pd.DataFrame) -> pd.DataFrame:
+    """Celdas (mes "YYYY-MM", transportista) del mapa de calor de on-time."""
+    grupos = grupos[grupos["transportista"].notna() & grupos["mes"].notna()]
+    if grupos.empty:
+        return pd.DataFrame(columns=["mes", "transportista", "despachos", "sla"])
+    agg = grupos.assign(
+        mes=grupos["mes"].dt.strftime("%Y-%m"), entrega_a_tiempo=grupos["a_tiempo"] / grupos["con_dato"]
+    )[["mes", "transportista", "despachos", "entrega_a_tiempo"]].reset_index(drop=True)
+    agg["sla"] = (agg["entrega_a_tiempo"] * 100).round(1)
+    return agg
+
+
+def pct_a_tiempo(despachos: pd.DataFrame, grupos: pd.DataFrame) -> float:
+    """% de entregas con fecha_entrega <= fecha_programada (NaN si no hay programada)."""
+    if despachos.empty or not {"fecha_entrega", "fecha_programada"}.issubset(despachos.columns):
+        return float("nan")
+    if grupos.empty:
+        return float(100.0 * (despachos["fecha_entrega"] <= despachos["fecha_programada"]).mean())
+    return float(100.0 * grupos["a_tiempo"].sum() / grupos["despachos"].sum())
+
+
+def lead_time_promedio(despachos: pd.DataFrame) -> float:
+    if despachos.empty or not {"fecha_pedido", "fecha_entrega"}.issubset(despachos.columns):
+        return float("nan")
+    return float(((despachos["fecha_entrega"] - despachos["fecha_pedido"]).dt.total_seconds() / 86400.0).mean())
+
+
+def pct_resueltos(reclamos: pd.DataFrame) -> float:
+    if reclamos.empty or "estado" not in reclamos.columns:
+        return float("nan")
+    # Contar por estado y normalizar solo las etiquetas distintas (estado es category)
+    conteo = reclamos["estado"].value_counts(dropna=False)
+    resueltos = sum(n for e, n in conteo.items() if pd.notna(e) and str(e).lower() == "resuelto")
+    return float(100.0 * resueltos / len(reclamos))
+
+
+def kpis(
+    df_pedidos: pd.DataFrame, df_despachos: pd.DataFrame, df_reclamos: pd.DataFrame
+) -> Tuple[float, float, float]:
+    """(% entregas a tiempo, lead time promedio en días, % reclamos resueltos)."""
+    return (
+        pct_a_tiempo(df_despachos, despachos_mes_transportista(df_despachos)),
+        lead_time_promedio(df_despachos),
+        pct_resueltos(df_reclamos),
+    )
+
+
+def serie_despachos(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "fecha_entrega" not in df.columns:
+        return pd.DataFrame(columns=["fecha", "despachos"])
+    return serie_diaria(df["fecha_entrega"])
+
+
+def hist_leadtime(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "lead_time_dias" not in df.columns:
+        return pd.DataFrame(columns=["desde", "hasta", "conteo"])
+    return histograma(df["lead_time_dias"])
+
+
+def pareto_causas(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "causa" not in df.columns:
+        return pd.DataFrame(columns=["causa", "conteo", "acum"])
+    # Contar primero y normalizar solo las etiquetas distintas (causa es category)
+    conteo = df["causa"].value_counts(dropna=False)
+    conteo = conteo[conteo > 0]
+    etiquetas = [str(c).strip() if pd.notna(c) and str(c).strip() else "Sin causa" for c in conteo.index]
+    top = conteo.groupby(etiquetas).sum().rename_axis("causa").reset_index(name="conteo")
+    return acumular_pareto(top)
+
+
+def acumular_pareto(top: pd.DataFrame) -> pd.DataFrame:
+    if top.empty:
+        return pd.DataFrame(columns=["causa", "conteo", "acum"])
+    top = top.sort_values("conteo", ascending=False, kind="stable").reset_index(drop=True)
+    top["acum"] = (top["conteo"].cumsum() / top["conteo"].sum() * 100).round(1)
+    return top
+
+
+def resumen_db(
+    db: Any,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    transportista: Optional[str] = None,
+    estado: Optional[str] = None,
+    causa: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    KPIs y datos de gráficos con agregados SQL sobre los rollups diarios
+    (GestorDB.kpis_reporte, resumen_*, serie_*, conteo_*). Mismas claves que
+    calcular_tablero para kpis, sla, calor, serie y pareto; fechas ISO.
+    """
+    args = (desde, hasta, transportista, estado)
+    k = db.kpis_reporte(*args, causa=causa)
+    por_trp = pd.DataFrame(db.resumen_despachos_transportista(*args))
+    por_mes = pd.DataFrame(db.resumen_despachos_mensual(*args))
+    serie = pd.DataFrame(db.serie_despachos_diaria(*args), columns=["fecha", "despachos"])
+    causas = pd.DataFrame(db.conteo_reclamos_causa(desde, hasta, causa), columns=["causa", "conteo"])
+    serie["fecha"] = pd.to_datetime(serie["fecha"]).dt.date
+    serie = reducir_serie(serie, "fecha", "despachos")
+
+    def _num(v) -> float:
+        return float(v) if v is not None else float("nan")
+
+    sla = (
+        por_trp.assign(sla=por_trp["pct_a_tiempo"].round(1))
+        if not por_trp.empty
+        else pd.DataFrame(columns=["transportista", "sla"])
+    )
+    calor = (
+        por_mes.assign(sla=por_mes["pct_a_tiempo"].round(1))
+        if not por_mes.empty
+        else pd.DataFrame(columns=["mes", "transportista", "sla"])
+    )
+    return {
+        "kpis": (_num(k["pct_a_tiempo"]), _num(k["lead_time_prom"]), _num(k["pct_resueltos"])),
+        "sla": sla,
+        "calor": calor,
+        "serie": serie,
+        "pareto": acumular_pareto(causas),
+    }
+
+
+def recomendaciones(pct_tiempo: float, t_prom: float, sla: pd.DataFrame) -> List[str]:
+    """Sugerencias según los KPIs y los dos transportistas de menor SLA."""
+    tips: List[str] = []
+    if pd.notna(pct_tiempo):
+        if pct_tiempo >= 95:
+            tips.append("Excelente nivel de servicio general (≥95%). Mantener acuerdos con transportistas.")
+        elif pct_tiempo >= 90:
+            tips.append("Buen nivel de servicio (90–95%). Revisar outliers por zona/transporte.")
+        else:
+            tips.append("Servicio <90%. Priorizar mejora con los 2 transportistas de menor SLA.")
+    if pd.notna(t_prom):
+        if t_prom <= 4:
+            tips.append("Lead time saludable (≤4 días).")
+        elif t_prom <= 6:
+            tips.append("Lead time moderado (4–6 días). Ajustar programación de despacho.")
+        else:
+            tips.append("Lead time alto (>6 días). Revisar cuellos de botella en preparación y ruta.")
+    if not sla.empty:
+        slas = sla.set_index("transportista")["sla"].astype(float).sort_values()
+        malos = slas.head(2)
+        if not malos.empty:
+            lows = ", ".join([f"{k} ({v:.1f}%)" for k, v in malos.items()])
+            tips.append(f"Transportistas a mejorar: {lows}.")
+    return tips
+
+
+def kpis_texto(pct_tiempo: float, t_prom: float, tasa_resueltos: float) -> Dict[str, str]:
+    """KPIs formateados para el PDF y la hoja KPIs ("N/D" si no hay dato)."""
+    return {
+        "% entregas a tiempo": f"{pct_tiempo:.1f}%" if pd.notna(pct_tiempo) else "N/D",
+        "Tiempo promedio de despacho": f"{t_prom:.2f} días" if pd.notna(t_prom) else "N/D",
+        "Tasa de reclamos resueltos": f"{tasa_resueltos:.1f}%" if pd.notna(tasa_resueltos) else "N/D",
+    }
+
+
+def tabla_ordenada(tabla: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas en el orden de ORDEN_TABLAS y filas de la más reciente a la más antigua."""
+    if df.empty:
+        return df
+    orden, col_fecha = ORDEN_TABLAS.get(tabla, ((), ""))
+    primeras = [c for c in orden if c in df.columns]
+    df = df[primeras + [c for c in df.columns if c not in primeras]]
+    if col_fecha in df.columns:
+        df = df.sort_values(col_fecha, ascending=False)
+    return df
+
+
+def calcular_tablero(
+    dfs: Dict[str, pd.DataFrame], partes: Iterable[str] = PARTES, pool: Optional[ThreadPoolExecutor] = None
+) -> Dict[str, Any]:
+    """
+    Calcula las ``partes`` pedidas (ver PARTES) para los DataFrames filtrados.
+
+    Devuelve un dict con esas claves: "kpis" es la tupla de ``kpis``; "sla",
+    "calor", "serie", "hist" y "pareto" son los DataFrames de cada gráfico y
+    "tablas" es {tabla: DataFrame ordenado para mostrar}.
+    """
+    partes = set(partes)
+    vacio = pd.DataFrame()
+    despachos = dfs.get("despachos", vacio)
+    reclamos = dfs.get("reclamos", vacio)
+    pool = pool or _executor()
+
+    futuros: Dict[str, "Future[Any]"] = {}
+
+    def lanzar(nombre: str, fn: Callable[..., Any], *args: Any) -> None:
+        futuros[nombre] = pool.submit(fn, *args)
+
+    if partes & {"kpis", "sla", "calor"}:
+        lanzar("grupos", despachos_mes_transportista, despachos)
+    if "kpis" in partes:
+        lanzar("lead_time", lead_time_promedio, despachos)
+        lanzar("resueltos", pct_resueltos, reclamos)
+    if "serie" in partes:
+        lanzar("serie", serie_despachos, despachos)
+    if "hist" in partes:
+        lanzar("hist", hist_leadtime, despachos)
+    if "pareto" in partes:
+        lanzar("pareto", pareto_causas, reclamos)
+    if "tablas" in partes:
+        for tabla, df in dfs.items():
+            lanzar(f"tabla:{tabla}", tabla_ordenada, tabla, df)
+
+    listos = {nombre: f.result() for nombre, f in futuros.items()}
+    resultado: Dict[str, Any] = {p: listos[p] for p in ("serie", "hist", "pareto") if p in partes}
+    if "grupos" in listos:
+        grupos = listos["grupos"]
+        if "sla" in partes:
+            resultado["sla"] = sla_transportista(grupos)
+        if "calor" in partes:
+            resultado["calor"] = calor_mes_transportista(grupos)
+        if "kpis" in partes:
+            resultado["kpis"] = (pct_a_tiempo(despachos, grupos), listos["lead_time"], listos["resueltos"])
+    if "tablas" in partes:
+        resultado["tablas"] = {t: listos[f"tabla:{t}"] for t in dfs}
+    return resultado
+
+
+def tamano_vista(valor: Any) -> int:
+    """
+    Bytes aproximados de una vista cacheada (DataFrames anidados en dicts o
+    tuplas). Las rebanadas que comparten memoria con la tabla completa se
+    cuentan como copias, así que la cota es conservadora.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, dict):
+        return sum(tamano_vista(v) for v in valor.values())
+    if isinstance(valor, (tuple, list)):
+        return sum(tamano_vista(v) for v in valor)
+    return 64
+
+
+_cache_vistas = CacheMemoria(REPORTE_CACHE_VISTAS_MB * 2**20, REPORTE_CACHE_VISTAS_MAX, tamano_vista)
+
+
+def vista_filtrada(
+    motor: MotorFiltros,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    partes: Iterable[str] = PARTES,
+    **iguales: Optional[str],
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    """
+    (frames filtrados, calcular_tablero de esos frames), cacheado por filtro y
+    versión. Los valores se comparten entre sesiones: no modificarlos.
+    """
+    partes = tuple(p for p in PARTES if p in set(partes))
+    clave = (motor.clave(desde, hasta, **iguales), partes)
+
+    def cargar() -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+        dfs = motor.filtrar(desde, hasta, **iguales)
+        return dfs, calcular_tablero(dfs, partes)
+
+    return _cache_vistas.obtener(clave, cargar)
+
+
+def estadisticas_vistas() -> Dict[str, Any]:
+    return _cache_vistas.estadisticas()
@@ -22,6 +22,11 @@ def validar_descripcion(descripcion: str, min_len: int = 10, max_len: int = 1000
         return False
     return min_len <= len(descripcion.strip()) <= max_len
 
+def validar_mensaje(mensaje: str, max_len: int = 500) -> bool:
+    if not mensaje:
+        return False
+    return 1 <= len(mensaje.strip()) <= max_len
+
 def validar_imagen(nombre: str, contenido: bytes) -> Optional[str]:
     """Valida extensión y tamaño. Retorna None si es válida o mensaje de error."""
     ext = Path(nombre).suffix.lower()
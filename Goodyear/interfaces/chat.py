@@ -10,16 +10,19 @@ class ChatReclamo:
     sobre un reclamo específico.
     """
     
-    def __init__(self, usuario_id: int, tipo_usuario: str, reclamo_id: int):
+    def __init__(self, usuario_id: int, tipo_usuario: str, reclamo_id: int, mensajes=None):
         """
         Args:
             usuario_id: ID del usuario actual
             tipo_usuario: 'cliente' o 'interno'
             reclamo_id: ID del reclamo asociado
+            mensajes: mensajes ya cargados (p.ej. con listar_mensajes_bulk);
+                si es None se consultan al renderizar
         """
         self.usuario_id = usuario_id
         self.tipo_usuario = tipo_usuario
         self.reclamo_id = reclamo_id
+        self.mensajes = mensajes
         self.db = GestorDB()
 
     def render(self):
@@ -31,7 +34,7 @@ class ChatReclamo:
         """, unsafe_allow_html=True)
         
         # Mostrar mensajes existentes
-        mensajes = self.db.listar_mensajes(self.reclamo_id)
+        mensajes = self.mensajes if self.mensajes is not None else self.db.listar_mensajes(self.reclamo_id)
         
         if not mensajes:
             st.info("No hay mensajes aún. ¡Sé el primero en escribir!")
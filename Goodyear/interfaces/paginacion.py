@@ -0,0 +1,42 @@
+import streamlit as st
+from typing import Any, Callable, Dict, List
+from config.configuracion import TAM_PAGINA
+
+def paginar(
+    clave: str,
+    cargar: Callable[[Any, int], List[Dict[str, Any]]],
+    filtros: tuple = (),
+    tam: int = TAM_PAGINA,
+    siguiente: Callable[[List[Dict[str, Any]], Any], Any] = lambda filas, cursor: filas[-1]["id"],
+) -> List[Dict[str, Any]]:
+    """
+    Paginación por keyset para listados ordenados por id descendente.
+
+    Guarda en session_state la pila de cursores (after_id) de las páginas
+    visitadas; al cambiar ``filtros`` vuelve a la primera página. ``cargar``
+    recibe (cursor, limit) y devuelve filas con campo ``id``. ``siguiente``
+    calcula el cursor de la página siguiente (por defecto, el último id).
+    """
+    estado = st.session_state.setdefault(f"pag_{clave}", {"filtros": filtros, "cursores": [None]})
+    if estado["filtros"] != filtros:
+        estado["filtros"] = filtros
+        estado["cursores"] = [None]
+    cursores = estado["cursores"]
+
+    # Se pide una fila extra solo para saber si existe página siguiente
+    filas = cargar(cursores[-1], tam + 1)
+    hay_siguiente = len(filas) > tam
+    filas = filas[:tam]
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Anterior", key=f"pag_prev_{clave}", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(cursores)} · {len(filas)} registro(s)")
+    with col3:
+        if st.button("Siguiente ▶", key=f"pag_next_{clave}", disabled=not hay_siguiente):
+            cursores.append(siguiente(filas, cursores[-1]))
+            st.rerun()
+    return filas
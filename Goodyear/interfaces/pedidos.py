@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 from core.gestor_reclamos import GestorDB
+from interfaces.paginacion import paginar
 
 db = GestorDB()
 
@@ -19,7 +20,12 @@ def mostrar():
         st.success(f"Pedido registrado con ID {pid}.")
 
     st.subheader("Mis pedidos")
-    for p in db.listar_pedidos_cliente(user["id"]):
+    pagina = paginar(
+        "pedidos_cliente",
+        lambda after_id, limit: db.listar_pedidos_cliente(user["id"], after_id, limit),
+        filtros=(user["id"],),
+    )
+    for p in pagina:
         st.markdown(f"ID {p['id']} — {p['fecha']}")
         st.write(p["detalle"])
         st.write("---")
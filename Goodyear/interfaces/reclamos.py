@@ -5,7 +5,6 @@ from PIL import Image
 from pathlib import Path
 from core.gestor_reclamos import GestorDB
 from core.validaciones import validar_descripcion, validar_imagen
-from core.gestor_archivos import guardar_imagen
 from config.configuracion import ROL_CLIENTE
 
 db = GestorDB()
@@ -34,22 +33,20 @@ def _form_registro(user):
             st.error("❌ La descripción debe tener entre 10 y 1000 caracteres.")
             return
         
+        # Validar imágenes adjuntas antes de registrar
+        validas = []
+        for img in imagenes or []:
+            contenido = img.getvalue()
+            err = validar_imagen(img.name, contenido)
+            if err:
+                st.warning(f"⚠️ No se adjuntó '{img.name}': {err}")
+                continue
+            validas.append((contenido, img.name))
+        
         try:
-            # Crear el reclamo
-            rid = db.crear_reclamo(user["id"], desc.strip())
-            
-            # Guardar imágenes adjuntas
-            imagenes_guardadas = 0
-            for img in imagenes or []:
-                contenido = img.getvalue()
-                err = validar_imagen(img.name, contenido)
-                if err:
-                    st.warning(f"⚠️ No se adjuntó '{img.name}': {err}")
-                    continue
-                
-                ruta = guardar_imagen(contenido, img.name, rid)
-                db.registrar_imagen(rid, ruta)
-                imagenes_guardadas += 1
+            # Reclamo e imágenes en una sola transacción
+            rid, rutas = db.crear_reclamo_con_imagenes(user["id"], desc.strip(), validas)
+            imagenes_guardadas = len(rutas)
             
             mensaje_exito = f"✅ Reclamo registrado con ID #{rid}."
             if imagenes_guardadas > 0:
@@ -70,6 +67,11 @@ def _listado(user):
         st.info("ℹ️ No tiene reclamos registrados. ¡Registre su primer reclamo arriba!")
         return
     
+    # Imágenes y mensajes de todos los reclamos listados en una consulta cada uno
+    ids = [r["id"] for r in reclamos]
+    imagenes = db.listar_imagenes_bulk(ids)
+    mensajes = db.listar_mensajes_bulk(ids)
+    
     for r in reclamos:
         # Determinar el color del estado
         color_estado = {
@@ -86,7 +88,7 @@ def _listado(user):
             st.write(r["descripcion"])
             
             # Mostrar imágenes adjuntas
-            imgs = db.listar_imagenes(r["id"])
+            imgs = imagenes[r["id"]]
             if imgs:
                 st.markdown(f"**📷 Imágenes adjuntas ({len(imgs)}):**")
                 cols = st.columns(min(len(imgs), 3))
@@ -105,7 +107,7 @@ def _listado(user):
             
             # Chat embebido
             from interfaces.chat import ChatReclamo
-            ChatReclamo(user["id"], "cliente", r["id"]).render()
+            ChatReclamo(user["id"], "cliente", r["id"], mensajes=mensajes[r["id"]]).render()
 
 def mostrar():
     """Función principal que renderiza la interfaz de reclamos para clientes."""
@@ -3,8 +3,9 @@ import os
 import streamlit as st
 from PIL import Image
 from pathlib import Path
-from core.gestor_reclamos import GestorDB
+from core.gestor_reclamos import GestorDB, consulta_fts
 from config.configuracion import ESTADOS, ROL_INTERNO
+from interfaces.paginacion import paginar
 
 db = GestorDB()
 
@@ -24,7 +25,7 @@ def _filtros():
         texto = st.text_input(
             "🔎 Buscar en descripción",
             placeholder="Ingrese palabras clave...",
-            help="Busca texto en la descripción de los reclamos"
+            help="Busca palabras (o su inicio) en la descripción, el chat y el usuario del cliente; ordena por relevancia"
         )
     
     estado_filtro = None if estado == "Todos" else estado
@@ -32,15 +33,33 @@ def _filtros():
 
 def _tabla(estado, texto, user):
     """Muestra la tabla de reclamos con opciones de gestión."""
-    reclamos = db.listar_reclamos_con_cliente(estado, texto)
+    # Texto sin palabras (p.ej. "-" o "#") no filtra: se muestra el listado completo
+    if consulta_fts(texto):
+        # Búsqueda por relevancia (FTS5): se pagina por desplazamiento
+        reclamos = paginar(
+            "reclamos_internos",
+            lambda offset, limit: db.buscar_reclamos(texto, estado, limit, offset or 0),
+            filtros=(estado, texto),
+            siguiente=lambda filas, offset: (offset or 0) + len(filas),
+        )
+    else:
+        reclamos = paginar(
+            "reclamos_internos",
+            lambda after_id, limit: db.listar_reclamos_con_cliente(estado, texto, after_id, limit),
+            filtros=(estado, texto),
+        )
     
     if not reclamos:
         st.info("ℹ️ No se encontraron reclamos con los filtros aplicados.")
         return
     
-    st.markdown(f"**📊 Total de reclamos: {len(reclamos)}**")
     st.markdown("---")
     
+    # Imágenes y mensajes de todos los reclamos listados en una consulta cada uno
+    ids = [r["id"] for r in reclamos]
+    imagenes = db.listar_imagenes_bulk(ids)
+    mensajes = db.listar_mensajes_bulk(ids)
+    
     for r in reclamos:
         # Determinar el color del estado
         color_estado = {
@@ -63,7 +82,7 @@ def _tabla(estado, texto, user):
             st.write(r["descripcion"])
             
             # Mostrar imágenes adjuntas
-            imgs = db.listar_imagenes(r["id"])
+            imgs = imagenes[r["id"]]
             if imgs:
                 st.markdown(f"**📷 Imágenes adjuntas ({len(imgs)}):**")
                 cols = st.columns(min(len(imgs), 3))
@@ -109,7 +128,7 @@ def _tabla(estado, texto, user):
             
             # Chat embebido
             from interfaces.chat import ChatReclamo
-            ChatReclamo(user["id"], "interno", r["id"]).render()
+            ChatReclamo(user["id"], "interno", r["id"], mensajes=mensajes[r["id"]]).render()
 
 def mostrar():
     """Función principal que renderiza la interfaz de reclamos internos."""
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
-import sqlite3
 import streamlit as st
-from config.configuracion import ROL_CLIENTE, ROL_INTERNO, DB_PATH
+from config.configuracion import ROL_CLIENTE, ROL_INTERNO
 from core.gestor_reclamos import GestorDB
 from core.seguridad import crear_usuario
 from interfaces import (
@@ -82,18 +81,9 @@ else:
 
         def _get_user_id(username: str):
             try:
-                con = sqlite3.connect(DB_PATH)
-                cur = con.cursor()
-                cur.execute("SELECT id FROM usuarios WHERE usuario=?", (username,))
-                row = cur.fetchone()
-                return int(row[0]) if row else None
+                return db.obtener_id_usuario(username)
             except Exception:
                 return None
-            finally:
-                try:
-                    con.close()
-                except Exception:
-                    pass
 
         with col1:
             if st.button("Crear cliente de prueba"):
@@ -117,20 +107,10 @@ else:
 
         with st.expander("Ver usuarios en la base de datos"):
             try:
-                con = sqlite3.connect(DB_PATH)
-                cur = con.cursor()
-                cur.execute("SELECT id, usuario, rol, email FROM usuarios ORDER BY id")
-                rows = cur.fetchall()
-                cols = ["id", "usuario", "rol", "email"]
-                data = [dict(zip(cols, r)) for r in rows]
+                data = db.listar_usuarios()
                 if data:
                     st.table(data)
                 else:
                     st.info("No hay usuarios registrados aún.")
             except Exception as e:
                 st.error(f"No se pudo leer la base de datos: {e}")
-            finally:
-                try:
-                    con.close()
-                except Exception:
-                    pass
@@ -0,0 +1,81 @@
+"""
+Genera sin Streamlit los reportes de la página de reportería: PDF de KPIs con
+recomendaciones, libro Excel y hojas filtradas particionadas por mes (ver
+core.reportes_programados). Pensado para cron; cada corrida deja sus archivos
+en REPORTES_DIR/<AAAA-MM-DD>/ y reutiliza las particiones sin cambios.
+
+    python Goodyear/utils/generar_reportes.py
+    python Goodyear/utils/generar_reportes.py --desde 2025-01-01 --transportista Olva --sin-excel
+
+    # crontab: todos los días a las 02:30
+    30 2 * * * cd /ruta/al/repo && python Goodyear/utils/generar_reportes.py
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Permitir importar core/ y config/ al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.configuracion import REPORTE_SNAPSHOT_DIR, REPORTES_CONSERVAR_DIAS, REPORTES_DIR
+from core.datos_reporte import CargadorIncremental
+from core.filtros_reporte import MotorFiltros
+from core.gestor_reclamos import GestorDB
+from core.reportes_programados import generar_reportes
+from core.tablero_reporte import kpis_texto, recomendaciones, resumen_db
+
+
+def _argumentos() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Reportes de reportería (PDF, Excel y CSV por mes) sin Streamlit.")
+    p.add_argument("--desde", type=date.fromisoformat, help="fecha inicial AAAA-MM-DD (inclusive)")
+    p.add_argument("--hasta", type=date.fromisoformat, help="fecha final AAAA-MM-DD (inclusive)")
+    p.add_argument("--transportista")
+    p.add_argument("--estado", help="estado del despacho")
+    p.add_argument("--causa", help="causa del reclamo")
+    p.add_argument("--dir", type=Path, default=REPORTES_DIR, help=f"carpeta de salida (por defecto {REPORTES_DIR})")
+    p.add_argument("--fecha", type=date.fromisoformat, default=date.today(), help="fecha de la corrida (hoy)")
+    p.add_argument("--sin-excel", action="store_true", help="no escribir el libro Excel")
+    p.add_argument("--conservar", type=int, default=REPORTES_CONSERVAR_DIAS, help="días de corridas a conservar (0 = todas)")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = _argumentos()
+    iguales = {"transportista": args.transportista, "estado": args.estado, "causa": args.causa}
+
+    db = GestorDB()
+    # El snapshot compartido con la página evita releer toda la base: solo se aplica el delta
+    dfs = CargadorIncremental(db, directorio_snapshot=REPORTE_SNAPSHOT_DIR).refrescar()
+    dfs_f = MotorFiltros(dfs).filtrar(args.desde, args.hasta, **iguales)
+
+    resumen = resumen_db(
+        db,
+        args.desde.isoformat() if args.desde else None,
+        args.hasta.isoformat() if args.hasta else None,
+        **iguales,
+    )
+    pct_tiempo, t_prom, tasa_resueltos = resumen["kpis"]
+    resultado = generar_reportes(
+        args.dir,
+        dfs_f,
+        kpis_texto(pct_tiempo, t_prom, tasa_resueltos),
+        recomendaciones(pct_tiempo, t_prom, resumen["sla"]),
+        fecha=args.fecha,
+        excel=not args.sin_excel,
+        conservar_dias=args.conservar,
+    )
+
+    print("\n" + "="*60)
+    print("📊 REPORTES GENERADOS")
+    print("="*60)
+    print(f"  🔹 Carpeta: {resultado['carpeta']}")
+    print(f"  🔹 Particiones escritas: {resultado['escritas']} · reutilizadas: {resultado['reutilizadas']}")
+    for archivo in resultado["archivos"]:
+        if archivo.suffix != ".csv":
+            print(f"  🔹 {archivo.name}")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Recalcula los rollups diarios de reportería (rollup_despachos_dia y
+rollup_reclamos_dia) desde las tablas base. Los triggers los mantienen al día;
+usar tras cargas masivas con triggers desactivados o ante sospecha de desvío.
+
+    python Goodyear/utils/reconstruir_rollups.py
+"""
+import sys
+from pathlib import Path
+
+# Permitir importar core/ y config/ al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.gestor_reclamos import GestorDB, conexion
+
+db = GestorDB()
+db.reconstruir_rollups()
+
+with conexion() as con:
+    n_des = con.execute("SELECT COUNT(*), COALESCE(SUM(despachos), 0) FROM rollup_despachos_dia").fetchone()
+    n_rec = con.execute("SELECT COUNT(*), COALESCE(SUM(reclamos), 0) FROM rollup_reclamos_dia").fetchone()
+
+print("\n" + "="*60)
+print("📊 ROLLUPS DE REPORTERÍA RECONSTRUIDOS")
+print("="*60)
+print(f"  🔹 rollup_despachos_dia: {n_des[0]} fila(s), {n_des[1]} despacho(s)")
+print(f"  🔹 rollup_reclamos_dia:  {n_rec[0]} fila(s), {n_rec[1]} reclamo(s)")
+print("="*60 + "\n")